@@ -0,0 +1,198 @@
+"""
+Stateless JWT authentication.
+
+Tokens carry the user's role, profile id and staff flag as signed claims (see RoleRefreshToken),
+so ClaimsJWTAuthentication builds a ClaimsUser from the token alone and permission checks cost no
+queries. Code that needs the real rows gets them through `ClaimsUser.user`/`.userprofile`, read
+from a short-lived copy of their fields in the shared cache, which leaves the password hashes out.
+
+Every request compares the token's claims with the user's current ones, kept in the shared cache
+and dropped whenever the user or its profile is saved, so a deactivated user is rejected right
+away and a user whose role changed has to refresh the token. Tokens issued before the claims
+existed are authenticated the old way, with a database lookup.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import UserProfile
+
+ROLE_CLAIM = 'role'
+PROFILE_CLAIM = 'profile_id'
+STAFF_CLAIM = 'is_staff'
+
+
+def claims_cache_key(user_id):
+    return f'accounts:jwt:claims:{user_id}'
+
+
+def current_claims(user_id, refresh=False):
+    """
+    The user's role claims as the database has them, None if the user is inactive or deleted.
+    Cached for an access token lifetime and dropped when the user or its profile is saved.
+    """
+    cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+    key = claims_cache_key(user_id)
+    claims = None if refresh else cache.get(key)
+    if claims is None:
+        user = (get_user_model().objects.filter(pk=user_id, is_active=True)
+                .values('is_staff', 'userprofile__id', 'userprofile__role').first())
+        claims = {} if user is None else {
+            PROFILE_CLAIM: user['userprofile__id'],
+            ROLE_CLAIM: user['userprofile__role'],
+            STAFF_CLAIM: user['is_staff'],
+        }
+        cache.set(key, claims, int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+    return claims or None
+
+
+def add_role_claims(token, user_id):
+    claims = current_claims(user_id, refresh=True)
+    if claims is None:
+        raise TokenError('The user is inactive or was deleted.')
+    for name, value in claims.items():
+        token[name] = value
+
+
+def blacklist_cache_key(jti):
+    return f'accounts:jwt:blacklisted:{jti}'
+
+
+def remember_blacklisted(jti, blacklisted, timeout):
+    cache = caches[settings.JWT_BLACKLIST_CACHE_ALIAS]
+    if blacklisted:
+        cache.set(blacklist_cache_key(jti), True, timeout)
+    else:
+        # add() never replaces a True written by a concurrent blacklisting
+        cache.add(blacklist_cache_key(jti), False, timeout)
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token with the role claims and a cached blacklist check. Every jti is remembered
+    as not blacklisted when it is issued and as blacklisted when it is (see accounts.signals),
+    so refreshing normally needs no lookup in the ever-growing blacklist table.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        add_role_claims(token, user.pk)
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        add_role_claims(access, self[api_settings.USER_ID_CLAIM])
+        return access
+
+    def set_jti(self):
+        super().set_jti()
+        remember_blacklisted(self[api_settings.JTI_CLAIM], False, int(self.lifetime.total_seconds()))
+
+    def check_blacklist(self):
+        jti = self[api_settings.JTI_CLAIM]
+        blacklisted = caches[settings.JWT_BLACKLIST_CACHE_ALIAS].get(blacklist_cache_key(jti))
+        if blacklisted is None:  # evicted, or issued before the cache was used
+            blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            remember_blacklisted(jti, blacklisted, max(self['exp'] - int(time.time()), 1))
+        if blacklisted:
+            raise TokenError('Token is blacklisted')
+
+
+def user_cache_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+# Never copied to the shared cache, loaded from the database when read
+UNCACHED_USER_FIELDS = ('password', 'confirm_password')
+
+
+def get_cached_user(user_id):
+    """
+    The user with its profile, cached for AUTH_USER_CACHE_TTL seconds and dropped when either is saved.
+    Only the field values are cached, without the password hashes, which stay deferred on the instance.
+    """
+    cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+    key = user_cache_key(user_id)
+    values = cache.get(key)
+    if values is None:
+        user_fields = [field.attname for field in get_user_model()._meta.concrete_fields
+                       if field.attname not in UNCACHED_USER_FIELDS]
+        profile_fields = [f'userprofile__{field.attname}' for field in UserProfile._meta.concrete_fields]
+        values = get_user_model().objects.filter(pk=user_id).values(*user_fields, *profile_fields).first()
+        if values is None:
+            raise get_user_model().DoesNotExist('User matching query does not exist.')
+        cache.set(key, values, settings.AUTH_USER_CACHE_TTL)
+
+    user = from_values(get_user_model(), values)
+    if values['userprofile__id'] is not None:
+        from_values(UserProfile, values, prefix='userprofile__').user = user  # caches user.userprofile too
+    return user
+
+
+def from_values(model, values, prefix=''):
+    """A `model` instance as if loaded from the database, its fields missing from `values` deferred."""
+    fields = [field.attname for field in model._meta.concrete_fields if prefix + field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, fields, [values[prefix + name] for name in fields])
+
+
+def invalidate_cached_user(user_id):
+    caches[settings.AUTH_USER_CACHE_ALIAS].delete_many([user_cache_key(user_id), claims_cache_key(user_id)])
+
+
+class ClaimsUser(TokenUser):
+    """
+    The authenticated user as described by its token. `role`, `userprofile_id` and `is_staff`
+    come from the claims, any other attribute is read from the cached user row.
+    """
+
+    def __str__(self):
+        return f'ClaimsUser {self.id}'
+
+    @cached_property
+    def role(self):
+        return self.token.get(ROLE_CLAIM)
+
+    @cached_property
+    def userprofile_id(self):
+        return self.token.get(PROFILE_CLAIM)
+
+    @cached_property
+    def is_staff(self):
+        return bool(self.token.get(STAFF_CLAIM))
+
+    @cached_property
+    def user(self):
+        return get_cached_user(self.id)
+
+    @property
+    def userprofile(self):
+        return self.user.userprofile
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if PROFILE_CLAIM not in validated_token or api_settings.USER_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        claims = current_claims(validated_token[api_settings.USER_ID_CLAIM])
+        if claims is None:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if any(validated_token.get(name) != value for name, value in claims.items()):
+            raise AuthenticationFailed("The user's role changed, refresh the token.", code='token_claims_changed')
+        return ClaimsUser(validated_token)
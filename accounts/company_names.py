@@ -0,0 +1,119 @@
+import bisect
+import csv
+import functools
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.db_router import replica_cache_timeout
+
+from .models import Company
+
+CSV_PATH = settings.BASE_DIR / 'company_names.csv'
+TAKEN_NAMES_KEY = 'accounts:company_names:taken'
+
+
+def normalize(name):
+    # The CSV has stray trailing and doubled spaces
+    return ' '.join(name.split())
+
+
+def trigrams(text):
+    return (text[start:start + 3] for start in range(len(text) - 2))
+
+
+class CompanyNameIndex:
+    """
+    Sorted prefix and trigram index over the predefined company names.
+
+    Matches are ranked: names starting with the query, then names with a word starting
+    with it, then names containing it anywhere. The first two are bisect lookups, the
+    last only checks the names sharing every trigram of the query, so it needs at least
+    MIN_SUBSTRING_LENGTH characters.
+    """
+    MIN_SUBSTRING_LENGTH = 3
+
+    def __init__(self, names):
+        self.names = []
+        seen = set()
+        for name in map(normalize, names):
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                self.names.append(name)
+
+        self.keys = [name.lower() for name in self.names]
+        self.prefixes = sorted((key, position) for position, key in enumerate(self.keys))
+        self.word_prefixes = sorted(
+            (word, position)
+            for position, key in enumerate(self.keys)
+            for word in key.split()[1:]
+        )
+        self.trigrams = {}
+        for position, key in enumerate(self.keys):
+            for trigram in set(trigrams(key)):
+                self.trigrams.setdefault(trigram, []).append(position)
+
+    @staticmethod
+    def _starting_with(entries, query):
+        start = bisect.bisect_left(entries, (query,))
+        for key, position in entries[start:]:
+            if not key.startswith(query):
+                break
+            yield position
+
+    def _containing(self, query):
+        postings = sorted((self.trigrams.get(trigram, []) for trigram in set(trigrams(query))), key=len)
+        candidates = set(postings[0])
+        for positions in postings[1:]:
+            candidates.intersection_update(positions)
+        return (position for position in sorted(candidates) if query in self.keys[position])
+
+    def search(self, query, exclude=frozenset(), limit=20):
+        query = normalize(query).lower()
+        if not query or limit <= 0:
+            return []
+
+        results = []
+        seen = set()
+
+        def collect(positions):
+            for position in positions:
+                if position in seen or self.keys[position] in exclude:
+                    continue
+                seen.add(position)
+                results.append(self.names[position])
+                if len(results) >= limit:
+                    return True
+            return False
+
+        if collect(self._starting_with(self.prefixes, query)):
+            return results
+        if collect(sorted(self._starting_with(self.word_prefixes, query), key=self.keys.__getitem__)):
+            return results
+        if len(query) >= self.MIN_SUBSTRING_LENGTH:
+            collect(self._containing(query))
+        return results
+
+
+@functools.lru_cache(maxsize=1)
+def get_index():
+    """Parsed once per process, the CSV only changes with a deploy."""
+    with open(CSV_PATH, mode='r', encoding='utf-8') as file:
+        return CompanyNameIndex(row[0] for row in csv.reader(file) if row)
+
+
+def get_taken_names():
+    """
+    Lowercased names of registered companies, cached until a Company is saved or deleted (or
+    briefly when read from a replica that may not have the latest companies yet).
+    """
+    cache = caches['shared']
+    taken = cache.get(TAKEN_NAMES_KEY)
+    if taken is None:
+        taken = frozenset(normalize(name).lower() for name in Company.objects.values_list('name', flat=True))
+        cache.set(TAKEN_NAMES_KEY, taken, replica_cache_timeout(None))
+    return taken
+
+
+def invalidate_taken_names(**kwargs):
+    caches['shared'].delete(TAKEN_NAMES_KEY)
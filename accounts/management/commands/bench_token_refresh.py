@@ -0,0 +1,85 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.authentication import RoleRefreshToken
+from accounts.models import CustomUser, UserProfile
+from accounts.serializers import RoleTokenRefreshSerializer
+from core.benchmark import rolled_back
+
+
+class DatabaseCheckRefreshToken(RoleRefreshToken):
+    # The stock lookup: a join of the blacklist and outstanding token tables on every refresh
+    check_blacklist = RefreshToken.check_blacklist
+
+
+class DatabaseCheckRefreshSerializer(RoleTokenRefreshSerializer):
+    token_class = DatabaseCheckRefreshToken
+
+
+class Command(BaseCommand):
+    help = ("Measure refresh-token latency with a large history of outstanding and blacklisted tokens, "
+            "for the stock blacklist lookup and the cached one, and how long pruning the expired ones takes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=1_000_000, help="Historical tokens to seed.")
+        parser.add_argument('--expired', type=float, default=0.9, help="Share of the seeded tokens that expired.")
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def seed(self, user, count, expired_share):
+        now = timezone.now()
+        for start in range(0, count, 10_000):
+            tokens = OutstandingToken.objects.bulk_create([
+                OutstandingToken(
+                    user=user, jti=uuid.uuid4().hex, token='-', created_at=now,
+                    expires_at=now - timedelta(days=1) if index < count * expired_share else now + timedelta(days=1),
+                )
+                for index in range(start, min(count, start + 10_000))
+            ])
+            # Every rotated token ends up blacklisted
+            BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens])
+
+    def measure(self, serializer_class, user, repeat):
+        timings, queries = [], []
+        for _ in range(repeat):
+            refresh = str(RoleRefreshToken.for_user(user))
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                serializer_class(data={'refresh': refresh}).is_valid(raise_exception=True)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured.captured_queries))
+        return statistics.median(timings), statistics.quantiles(timings, n=20)[-1], statistics.median(queries)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            user = CustomUser.objects.create_user(email='bench-refresh@example.com', password='-')
+            UserProfile.objects.create(user=user, role=UserProfile.Role.SELLER)
+
+            start = time.perf_counter()
+            self.seed(user, options['tokens'], options['expired'])
+            self.stdout.write(f'Seeded {options["tokens"]} tokens in {time.perf_counter() - start:.1f} s')
+
+            backend = caches[settings.JWT_BLACKLIST_CACHE_ALIAS].__class__.__name__
+            self.stdout.write(f'Blacklist cache: {backend}')
+            self.stdout.write(f'{"blacklist check":<16} {"p50 ms":>8} {"p95 ms":>8} {"queries":>8}')
+            for label, serializer_class in (('database', DatabaseCheckRefreshSerializer),
+                                            ('cached', RoleTokenRefreshSerializer)):
+                p50, p95, queries = self.measure(serializer_class, user, options['repeat'])
+                self.stdout.write(f'{label:<16} {p50:8.2f} {p95:8.2f} {queries:8.0f}')
+
+            start = time.perf_counter()
+            call_command('prune_jwt_tokens', stdout=StringIO())
+            remaining = OutstandingToken.objects.count()
+            self.stdout.write(f'Pruned the expired tokens in {time.perf_counter() - start:.1f} s, {remaining} left')
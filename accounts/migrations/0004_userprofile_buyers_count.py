@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_company_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='buyers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:42
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userprofile_buyers_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(django.db.models.functions.text.Upper('city'), name='accounts_company_city_upper'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import User, AbstractUser
 from django.db import models
+from django.db.models.functions import Upper
 
 from core.models import TimeStampedModel
 from cosmic_server7 import settings
@@ -65,6 +66,9 @@ class UserProfile(TimeStampedModel):
 
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     role = models.CharField(max_length=10, choices=Role.choices)
+    # Distinct WhatsApp numbers that interacted with any of this seller's solutions.
+    # Maintained by BuyerInteraction.objects.record(), rebuilt by `manage.py rebuild_interaction_counters`
+    buyers_count = models.PositiveIntegerField(default=0, editable=False)
 
     _user_id_cache = None  # Initialize a private cache variable
 
@@ -86,5 +90,11 @@ class Company(TimeStampedModel):
     description = models.TextField()
     city = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            # The listing city filter is `seller__company__city__iexact`, i.e. UPPER(city) = UPPER(%s)
+            models.Index(Upper('city'), name='accounts_company_city_upper'),
+        ]
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -1,38 +1,49 @@
-from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.permissions import BasePermission
+
+from .authentication import ClaimsUser
+from .models import UserProfile
+
+
+def get_user_role(user):
+    """
+    Return the UserProfile role of the user, or None for anonymous users and users without a profile.
+    Users authenticated from token claims answer without a query.
+    """
+    if not user or not user.is_authenticated:
+        return None
+    if isinstance(user, ClaimsUser):
+        return user.role
+    try:
+        return user.userprofile.role
+    except UserProfile.DoesNotExist:
+        return None
 
 
 class BaseRolePermission(BasePermission):
+    """Staff users and users with one of `roles`."""
+    roles = ()
+
     def is_staff_user(self, request):
         return request.user.is_staff
 
     def has_permission(self, request, view):
-        return self.is_staff_user(request)
+        return bool(
+            request.user and request.user.is_authenticated and
+            (self.is_staff_user(request) or get_user_role(request.user) in self.roles)
+        )
 
 
 class IsAdmin(BaseRolePermission):
-    def has_permission(self, request, view):
-        if request.user.is_authenticated:
-            return IsAuthenticated and super().has_permission(request, view) or request.user.userprofile.role == 'admin'
-        return False
+    roles = (UserProfile.Role.ADMIN,)
 
 
 class IsSeller(BaseRolePermission):
-    def has_permission(self, request, view):
-        if request.user.is_authenticated:
-            return IsAuthenticated and (super().has_permission(request, view) or request.user.userprofile.role == 'seller')
-        return False
+    roles = (UserProfile.Role.SELLER,)
 
 
 class IsBuyer(BaseRolePermission):
-    def has_permission(self, request, view):
-        if request.user.is_authenticated:
-            return IsAuthenticated and super().has_permission(request, view) or request.user.userprofile.role == 'buyer'
-        return False
+    roles = (UserProfile.Role.BUYER,)
 
 
-class IsAdminOrSeller(BasePermission):
-    def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and
-            (request.user.is_staff or request.user.userprofile.role in ['seller', 'admin'])
-        )
\ No newline at end of file
+class IsAdminOrSeller(BaseRolePermission):
+    roles = (UserProfile.Role.SELLER, UserProfile.Role.ADMIN)
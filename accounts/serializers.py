@@ -1,7 +1,8 @@
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .authentication import RoleRefreshToken
 from .models import UserProfile, CustomUser, Company
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.exceptions import ValidationError as DRFValidationError, ValidationError
@@ -52,10 +53,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     def get_buyers_count(self, obj):
         if obj.role == UserProfile.Role.SELLER:
-            # Count unique whatsapp numbers who have interacted with any of the seller's solutions
-            return obj.solar_solutions.filter(
-                interactions__isnull=False
-            ).values('interactions__whatsapp_number').distinct().count()
+            # Unique whatsapp numbers who have interacted with any of the seller's solutions (denormalized)
+            return obj.buyers_count
         return 0
 
     def get_packages_count(self, obj):
@@ -104,7 +103,12 @@ class PasswordResetSerializer(serializers.Serializer):
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
     def validate(self, attrs):
         data = super().validate(attrs)
         data['role'] = self.user.userprofile.role
-        return data
\ No newline at end of file
+        return data
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
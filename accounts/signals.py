@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import company_names
+from .authentication import invalidate_cached_user, remember_blacklisted
+from .models import Company, CustomUser, UserProfile
+
+
+@receiver([post_save, post_delete], sender=Company)
+def invalidate_taken_company_names(sender, **kwargs):
+    company_names.invalidate_taken_names()
+    # A request running while the transaction was open may have cached the old names again
+    transaction.on_commit(company_names.invalidate_taken_names)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    user_id = instance.pk if sender is CustomUser else instance.user_id
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def remember_blacklisted_token(sender, instance, **kwargs):
+    token = instance.token
+    remaining = int((token.expires_at - timezone.now()).total_seconds())
+    if remaining > 0:
+        remember_blacklisted(token.jti, True, remaining)
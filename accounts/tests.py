@@ -1,7 +1,23 @@
 from django.contrib.auth import get_user_model
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
-from .models import UserProfile
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.models import Job
+from .authentication import get_cached_user, user_cache_key
+from .company_names import CompanyNameIndex
+from .models import UserProfile, Company
 
 class BaseTestCase(APITestCase):
     def authenticate_user(self, email='testuser@example.com', password='password', role='seller'):
@@ -31,3 +47,209 @@ class BaseTestCase(APITestCase):
     def setUp(self):
         # Call the helper method to authenticate a user before each test
         self.authenticate_user()
+
+
+class CompanyNameIndexTestCase(SimpleTestCase):
+    def setUp(self):
+        self.index = CompanyNameIndex([
+            'Sun Players & Co   ', 'Solar Sun', 'Bright  Sun Energy', 'Axovolt', 'Sunrise Power', 'solar sun',
+        ])
+
+    def test_names_are_trimmed_and_deduplicated(self):
+        self.assertEqual(self.index.names, ['Sun Players & Co', 'Solar Sun', 'Bright Sun Energy', 'Axovolt',
+                                            'Sunrise Power'])
+
+    def test_prefix_matches_rank_before_word_and_substring_matches(self):
+        self.assertEqual(self.index.search('sun'),
+                         ['Sun Players & Co', 'Sunrise Power', 'Bright Sun Energy', 'Solar Sun'])
+        self.assertEqual(self.index.search('volt'), ['Axovolt'])
+        self.assertEqual(self.index.search('rise po'), ['Sunrise Power'])
+
+    def test_short_queries_only_match_prefixes(self):
+        self.assertEqual(self.index.search('ol'), [])
+        self.assertEqual(self.index.search('so'), ['Solar Sun'])
+
+    def test_limit_and_exclude(self):
+        self.assertEqual(self.index.search('sun', limit=2), ['Sun Players & Co', 'Sunrise Power'])
+        self.assertEqual(self.index.search('sun', exclude={'sunrise power', 'solar sun'}),
+                         ['Sun Players & Co', 'Bright Sun Energy'])
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'company-names-tests'},
+})
+class CompanyNamesListViewTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        caches['shared'].clear()
+        self.url = reverse('company-names')
+
+    def test_csv_names_are_trimmed(self):
+        response = self.client.get(self.url, {'search': 'axovolt'})
+        self.assertEqual(response.data['company_names'], ['Axovolt'])
+
+    def test_registered_companies_are_excluded(self):
+        self.client.get(self.url, {'search': 'axovolt'})  # warm the cached taken names
+
+        Company.objects.create(owner=self.user_profile, name='Axovolt', phone_number='0', description='-',
+                               city='Lahore')
+
+        response = self.client.get(self.url, {'search': 'axovolt'})
+        self.assertEqual(response.data['company_names'], [])
+
+    def test_results_are_limited(self):
+        response = self.client.get(self.url, {'search': 'a', 'limit': 5})
+        self.assertEqual(len(response.data['company_names']), 5)
+
+    def test_search_is_required(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(JOBS_RUN_INLINE=False)
+class ForgotPasswordTestCase(BaseTestCase):
+    def test_reset_email_is_queued(self):
+        self.client.credentials()
+
+        response = self.client.post(reverse('userprofile-forgot-password'), {'email': 'testuser@example.com'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.kwargs['email'], 'testuser@example.com')
+        self.assertTrue(job.kwargs['reset_url'].endswith(f'reset-password/{self.user_profile.id}/'))
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'claims-tests'},
+})
+class ClaimsAuthenticationTestCase(BaseTestCase):
+    def account_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries.captured_queries
+                if 'accounts_customuser' in query['sql'] or 'accounts_userprofile' in query['sql']]
+
+    def test_login_token_carries_the_role(self):
+        token = AccessToken(self.token)
+
+        self.assertEqual((token['role'], token['profile_id'], token['is_staff']),
+                         ('seller', self.user_profile.id, False))
+
+    def test_permission_checks_need_no_queries(self):
+        self.assertEqual(self.account_queries(reverse('panel-my-panels')), [])
+
+    def test_full_user_is_read_through_the_cache(self):
+        url = reverse('analytics-seller-analytics')
+
+        self.assertEqual(len(self.account_queries(url, {'mode': 'summary'})), 1)
+        self.assertEqual(self.account_queries(url, {'mode': 'summary'}), [])
+
+        self.user.full_name = 'Renamed Seller'
+        self.user.save()
+        response = self.client.get(url, {'mode': 'summary'})
+        self.assertEqual(response.data['seller_name'], 'Renamed Seller')
+
+    def test_cached_user_leaves_the_password_out(self):
+        self.client.get(reverse('analytics-seller-analytics'), {'mode': 'summary'})
+
+        cached = caches['shared'].get(user_cache_key(self.user.id))
+        self.assertFalse({'password', 'confirm_password'} & set(cached))
+        self.assertNotIn(self.user.password, cached.values())
+        user = get_cached_user(self.user.id)
+        self.assertEqual((user.full_name, user.userprofile.id), ('Test User', self.user_profile.id))
+        self.assertTrue(user.check_password('password'))  # loaded on access
+
+    def test_refresh_reads_the_role_again(self):
+        refresh = self.client.post(reverse('login'), {'email': 'testuser@example.com', 'password': 'password'})
+        self.user_profile.role = UserProfile.Role.ADMIN
+        self.user_profile.save()
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh.data['refresh']})
+
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'admin')
+
+    def test_inactive_users_cannot_refresh(self):
+        refresh = self.client.post(reverse('login'), {'email': 'testuser@example.com', 'password': 'password'})
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh.data['refresh']})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_takes_effect_right_away(self):
+        url = reverse('panel-my-panels')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_role_changes_require_a_refresh(self):
+        url = reverse('panel-my-panels')
+        refresh = self.client.post(reverse('login'), {'email': 'testuser@example.com', 'password': 'password'})
+        self.user_profile.role = UserProfile.Role.BUYER
+        self.user_profile.save()
+
+        self.assertEqual(self.client.get(url).status_code, 401)
+        access = self.client.post(reverse('token_refresh'), {'refresh': refresh.data['refresh']}).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_tokens_without_claims_still_work(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        self.assertTrue(self.account_queries(reverse('panel-my-panels')))
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'blacklist-tests'},
+})
+class TokenBlacklistTestCase(BaseTestCase):
+    def login(self):
+        response = self.client.post(reverse('login'), {'email': 'testuser@example.com', 'password': 'password'})
+        return response.data['refresh']
+
+    def refresh(self, token):
+        return self.client.post(reverse('token_refresh'), {'refresh': token})
+
+    def test_refresh_skips_the_blacklist_lookup(self):
+        token = self.login()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh(token)
+
+        self.assertEqual(response.status_code, 200)
+        lookups = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT') and 'token_blacklist_blacklistedtoken' in query['sql']
+                   and '"jti"' in query['sql']]
+        self.assertEqual(lookups, [])
+
+    def test_rotated_tokens_are_rejected(self):
+        token = self.login()
+        self.refresh(token)
+
+        self.assertEqual(self.refresh(token).status_code, 401)
+        caches['shared'].clear()  # evicted entries fall back to the database
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_prune_deletes_expired_tokens_in_batches(self):
+        self.login()
+        now = timezone.now()
+        for index in range(5):
+            expired = OutstandingToken.objects.create(user=self.user, jti=f'expired-{index}', token='-',
+                                                      expires_at=now - timedelta(hours=1))
+            BlacklistedToken.objects.create(token=expired)
+
+        call_command('prune_jwt_tokens', batch_size=2, stdout=StringIO())
+
+        self.assertFalse(OutstandingToken.objects.filter(expires_at__lte=now).exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertEqual(OutstandingToken.objects.count(), 2)  # the two logins of this test
@@ -1,8 +1,5 @@
-import csv
-
 import django_filters
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
@@ -15,8 +12,12 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from core.db_router import ReplicaReadMixin
+from core.jobs import enqueue
+from core.tasks import send_password_reset_email
 from cosmic_server7 import settings
-from .models import UserProfile, Company
+from . import company_names
+from .models import UserProfile
 from .permissions import IsAdmin
 from .serializers import UserProfileSerializer, ForgotPasswordSerializer, PasswordResetSerializer, \
     CustomTokenObtainPairSerializer
@@ -27,8 +28,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         'user', 
         'company'
     ).prefetch_related(
-        'solar_solutions',
-        'solar_solutions__interactions'
+        'solar_solutions'
     )
     serializer_class = UserProfileSerializer
 
@@ -87,7 +87,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_profile(self, request):
         try:
-            user_profile = UserProfile.objects.select_related('user').get(user=request.user)
+            user_profile = UserProfile.objects.select_related('user').get(user_id=request.user.id)
             serializer = self.get_serializer(user_profile)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except UserProfile.DoesNotExist:
@@ -110,13 +110,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             reset_url = f"{settings.FRONTEND_BASE_URL}reset-password/{user.userprofile_id}/"
 
             # Send an email with the reset link
-            send_mail(
-                subject='Reset your password',
-                message=f'Please use the following link to reset your password: {reset_url}',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=True,
-            )
+            enqueue(send_password_reset_email, email=email, reset_url=reset_url)
 
             return Response({"detail": "Email sent. Please check your inbox."}, status=status.HTTP_200_OK)
 
@@ -142,9 +136,12 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
-class CompanyNamesListView(APIView):
+class CompanyNamesListView(ReplicaReadMixin, APIView):
     permission_classes = [AllowAny]
 
+    default_limit = 20
+    max_limit = 100
+
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter(
@@ -153,6 +150,12 @@ class CompanyNamesListView(APIView):
                 description="Search term to filter company names.",
                 type=openapi.TYPE_STRING,
                 required=True
+            ),
+            openapi.Parameter(
+                'limit',
+                openapi.IN_QUERY,
+                description="Maximum number of names to return (default 20, max 100).",
+                type=openapi.TYPE_INTEGER
             )
         ]
     )
@@ -162,27 +165,17 @@ class CompanyNamesListView(APIView):
         if not search_query:
             raise ValidationError({"error": "'search' query parameter is required"})
 
-        csv_file_path = 'company_names.csv'
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({"error": "'limit' must be an integer"})
 
-        predefined_company_names = []
         try:
-            with open(csv_file_path, mode='r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip the header row if it exists
-                predefined_company_names = [row[0] for row in reader]
+            index = company_names.get_index()
         except FileNotFoundError:
             return Response({"error": "CSV file not found"}, status=404)
 
-        existing_company_names = set(Company.objects.values_list('name', flat=True))
-
-        # Exclude existing companies from the predefined list
-        available_company_names = [
-            name for name in predefined_company_names if name not in existing_company_names
-        ]
-
-        # Apply search filter based on 'search' query parameter
-        available_company_names = [
-            name for name in available_company_names if search_query.lower() in name.lower()
-        ]
+        # Ranked matches from the in-memory index, minus names that are already registered
+        available_company_names = index.search(search_query, exclude=company_names.get_taken_names(), limit=limit)
 
         return Response({"company_names": available_company_names})
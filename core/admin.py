@@ -1,3 +1,10 @@
 from django.contrib import admin
+from core.models import Job
 
-# Register your models here.
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'run_at', 'updated')
+    list_filter = ('status', 'task')
+
+
+admin.site.register(Job, JobAdmin)
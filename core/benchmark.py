@@ -0,0 +1,36 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back(using=None):
+    """
+    Run a block inside a transaction that is always rolled back, so benchmarks can
+    seed as much data as they like without leaving anything behind.
+    """
+    try:
+        with transaction.atomic(using=using):
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def median_ms(func, repeat=5, warmup=1):
+    """Call `func` `repeat` times (after `warmup` untimed calls) and return the median in milliseconds."""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
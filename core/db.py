@@ -0,0 +1,76 @@
+"""
+Database connection settings and per-process connection metrics.
+
+`connection_settings()` completes a DATABASES entry. By default connections are persistent
+(`CONN_MAX_AGE`) and health checked before they are reused, so every worker thread keeps one
+connection open across requests. With `pool` Django's psycopg pool is used instead, sized per
+worker process; that needs psycopg 3 with psycopg_pool, psycopg2 cannot pool.
+
+`connection_metrics()` reports how often this process connected for how many requests, and the
+pool's own counters when pooling, served to admins by core.views.DatabaseMetricsView.
+"""
+import os
+import threading
+from collections import Counter
+
+from django.db import connections
+
+
+def connection_settings(database, max_age=600, health_checks=True, pool=False, pool_min_size=2, pool_max_size=10,
+                        pool_timeout=10):
+    database = dict(database)
+    database['CONN_HEALTH_CHECKS'] = health_checks
+    if pool:
+        # Django refuses persistent connections on top of a pool, returning a connection to the
+        # pool is what keeps it open
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {**database.get('OPTIONS', {}), 'pool': {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': pool_timeout,
+        }}
+    else:
+        database['CONN_MAX_AGE'] = max_age
+    return database
+
+
+_connects = Counter()
+_requests = 0
+_metrics_lock = threading.Lock()
+
+
+def count_connect(alias):
+    """Called for every new connection, or every pool checkout when pooling (see core.signals)."""
+    with _metrics_lock:
+        _connects[alias] += 1
+
+
+def count_request():
+    global _requests
+    with _metrics_lock:
+        _requests += 1
+
+
+def pool_metrics(pool):
+    stats = pool.get_stats()
+    in_use = stats['pool_size'] - stats['pool_available']
+    return {**stats, 'in_use': in_use, 'saturation': round(in_use / stats['pool_max'], 3)}
+
+
+def connection_metrics():
+    with _metrics_lock:
+        requests, connects = _requests, dict(_connects)
+
+    databases = {}
+    for alias in connections:
+        wrapper = connections[alias]
+        pool = getattr(wrapper, 'pool', None)
+        databases[alias] = {
+            'vendor': wrapper.vendor,
+            'conn_max_age': wrapper.settings_dict['CONN_MAX_AGE'],
+            'health_checks': wrapper.settings_dict['CONN_HEALTH_CHECKS'],
+            'connects': connects.get(alias, 0),
+            'connects_per_request': round(connects.get(alias, 0) / requests, 3) if requests else None,
+            'pool': pool_metrics(pool) if pool is not None else None,
+        }
+    return {'pid': os.getpid(), 'requests': requests, 'databases': databases}
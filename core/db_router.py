@@ -0,0 +1,143 @@
+"""
+Read replica routing.
+
+Views opt in with `ReplicaReadMixin`: while one of their safe-method requests runs, ReplicaRouter
+sends reads to the 'replica' database. The primary is used instead when the user wrote something
+within the last REPLICA_STICKY_SECONDS (read-your-writes, see ReplicaStickinessMiddleware), or when
+the replica lags more than REPLICA_MAX_LAG seconds behind or cannot be reached. All writes, and all
+reads outside such requests (management commands, jobs), go to the primary.
+
+Without a 'replica' in DATABASES everything reads from the primary.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+
+_reading_from_replica = ContextVar('reading_from_replica', default=False)
+
+# Postgres standby lag, 0 while it has replayed everything it received (an idle primary sends nothing)
+LAG_SQL = '''
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+'''
+
+_lag = {'seconds': None, 'checked_at': None}
+_lag_lock = threading.Lock()
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def reading_from_replica():
+    return _reading_from_replica.get()
+
+
+def measure_replica_lag():
+    """Seconds the replica is behind the primary, None when it cannot be reached."""
+    replica = connections[REPLICA]
+    if replica.vendor != 'postgresql':
+        return 0
+    try:
+        with replica.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        logger.warning('Read replica is unreachable, reading from the primary', exc_info=True)
+        return None
+
+
+def replica_lag():
+    """measure_replica_lag(), measured at most once per REPLICA_LAG_CHECK_INTERVAL by this process."""
+    now = time.monotonic()
+    with _lag_lock:
+        if _lag['checked_at'] is None or now - _lag['checked_at'] >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            _lag['seconds'], _lag['checked_at'] = measure_replica_lag(), now
+        return _lag['seconds']
+
+
+def sticky_key(user_id):
+    return f'core:replica:sticky:{user_id}'
+
+
+def stick_to_primary(user_id):
+    caches[settings.REPLICA_CACHE_ALIAS].set(sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def can_read_from_replica(user):
+    if user.is_authenticated and caches[settings.REPLICA_CACHE_ALIAS].get(sticky_key(user.pk)):
+        return False
+    lag = replica_lag()
+    return lag is not None and lag <= settings.REPLICA_MAX_LAG
+
+
+def replica_cache_timeout(timeout):
+    """
+    Cache timeout for a value read in the current request. A replica may be up to REPLICA_MAX_LAG
+    seconds behind, so what it returned is not kept for longer than that.
+    """
+    if not reading_from_replica():
+        return timeout
+    return settings.REPLICA_MAX_LAG if timeout is None else min(timeout, settings.REPLICA_MAX_LAG)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return REPLICA if _reading_from_replica.get() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explicit, otherwise Django would write an instance back to the database it was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # the replica holds the same rows as the primary
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin: the requests for which `reads_from_replica()` is true read from the replica
+    once authentication and permission checks have passed.
+    """
+
+    def reads_from_replica(self, request):
+        return request.method in SAFE_METHODS
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if replica_configured() and self.reads_from_replica(request) and can_read_from_replica(request.user):
+            self._replica_token = _reading_from_replica.set(True)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # Also after unhandled exceptions, the worker thread serves other views next
+            token = self.__dict__.pop('_replica_token', None)
+            if token is not None:
+                _reading_from_replica.reset(token)
+
+
+class ReplicaStickinessMiddleware:
+    """Sends the reads of a user who just wrote to the primary for REPLICA_STICKY_SECONDS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_configured():
+            # DRF sets the token authenticated user on the Django request
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                stick_to_primary(user.pk)
+        return response
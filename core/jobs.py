@@ -0,0 +1,102 @@
+"""
+A small job queue stored in the database, no broker needed.
+
+Jobs are rows of core.models.Job. `enqueue()` inserts one inside the caller's transaction, so
+a job is only visible to workers once the request that created it has committed (and never if
+it rolled back). `manage.py run_jobs` claims due jobs, runs them and retries failures with an
+exponential backoff until `max_attempts`, after which the job is left `dead` for inspection.
+
+With `JOBS_RUN_INLINE` the job runs right away in the calling process, which is what tests use.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task_path(task):
+    if isinstance(task, str):
+        return task
+    return f'{task.__module__}.{task.__qualname__}'
+
+
+def enqueue(task, *, delay=0, max_attempts=None, **kwargs):
+    """
+    Queue `task(**kwargs)`. `task` is a module level function or its dotted path and
+    `kwargs` must be JSON serializable (pass ids, not model instances).
+    """
+    job = Job.objects.create(
+        task=task_path(task),
+        kwargs=kwargs,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if settings.JOBS_RUN_INLINE:
+        job.status = Job.Status.RUNNING
+        job.attempts = 1
+        run_job(job)
+    return job
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt: base, 2x base, 4x base... capped at an hour."""
+    return min(settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1), 3600)
+
+
+def claim_jobs(limit=10):
+    """
+    Lock up to `limit` due jobs for this worker. Jobs left `running` by a worker that died
+    are claimed again once their lock is older than `JOBS_LOCK_TIMEOUT`.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.Status.PENDING, run_at__lte=now) | Q(status=Job.Status.RUNNING, locked_at__lt=stale))
+            .order_by('run_at', 'id')[:limit]
+        )
+        for job in jobs:
+            job.status = Job.Status.RUNNING
+            job.locked_at = now
+            job.attempts += 1
+        Job.objects.bulk_update(jobs, ['status', 'locked_at', 'attempts'])
+    return jobs
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome. Returns True when it succeeded."""
+    try:
+        import_string(job.task)(**job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.Status.DEAD
+            logger.error('Job %s (%s) is dead after %s attempts', job.id, job.task, job.attempts)
+        else:
+            job.status = Job.Status.PENDING
+            job.run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning('Job %s (%s) failed, retrying at %s', job.id, job.task, job.run_at)
+        success = False
+    else:
+        job.status = Job.Status.DONE
+        job.last_error = ''
+        success = True
+
+    job.locked_at = None
+    job.save(update_fields=['status', 'attempts', 'run_at', 'locked_at', 'last_error', 'updated'])
+    return success
+
+
+def purge_done_jobs(older_than):
+    deleted, _ = Job.objects.filter(status=Job.Status.DONE, updated__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import claim_jobs, run_job, purge_done_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (emails, WhatsApp messages...) with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are due and exit.")
+        parser.add_argument('--batch', type=int, default=10, help="Jobs claimed per round.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--keep-done-days', type=int, default=7,
+                            help="Finished jobs older than this are deleted when the queue is idle.")
+
+    def handle(self, *args, **options):
+        keep_done = timedelta(days=options['keep_done_days'])
+        while True:
+            jobs = claim_jobs(limit=options['batch'])
+            for job in jobs:
+                run_job(job)
+                self.stdout.write(f'{job.task} #{job.id}: {job.status} after {job.attempts} attempt(s)')
+
+            if not jobs:
+                if options['once']:
+                    break
+                purge_done_jobs(older_than=keep_done)
+                time.sleep(options['sleep'])
@@ -8,3 +8,33 @@ class TimeStampedModel(models.Model):
 
     class Meta:
         abstract = True  # This will make the model abstract, so no table is created for it.
+
+
+class Job(TimeStampedModel):
+    """
+    A unit of background work (an email, a WhatsApp message...) queued in the database and
+    run by `manage.py run_jobs`. See core.jobs.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        DEAD = 'dead', 'Dead'
+
+    task = models.CharField(max_length=200, help_text="Dotted path of the function to call")
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not picked up before this time")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='core_job_status_run_at'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} ({self.status})'
@@ -0,0 +1,117 @@
+"""
+Request profiling that is safe to leave on in production.
+
+`ProfilingMiddleware` replaces `silk.middleware.SilkyMiddleware`. Only a sample of requests
+goes through silk (and writes its rows): `PROFILING_SAMPLE_RATE` of them at random, requests
+carrying the `PROFILING_TRIGGER_HEADER` with the `PROFILING_TRIGGER_TOKEN`, and requests by
+admins with `?profile=1`. Everything else skips silk's SQL hook and writes nothing.
+
+Every request is timed though, and the slowest ones are kept in a per-process ring buffer
+(`slow_requests`, snapshot with `recent_slow_requests()`), served to admins by
+core.views.SlowRequestsView.
+"""
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models.sql.compiler import SQLCompiler
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from silk.collector import DataCollector
+from silk.middleware import SilkyMiddleware
+from silk.sql import execute_sql as silk_execute_sql
+
+from accounts.authentication import ClaimsJWTAuthentication
+from accounts.permissions import get_user_role
+
+slow_requests = deque(maxlen=settings.PROFILING_SLOW_BUFFER_SIZE)
+_slow_requests_lock = threading.Lock()
+
+_profiling = ContextVar('profiling', default=False)
+
+
+def requested_by_admin(request):
+    if request.GET.get('profile') not in ('1', 'true'):
+        return False
+    try:
+        authenticated = ClaimsJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    user = authenticated[0] if authenticated else getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and (user.is_staff or get_user_role(user) == 'admin'))
+
+
+def should_profile(request):
+    token = settings.PROFILING_TRIGGER_TOKEN
+    if token and request.headers.get(settings.PROFILING_TRIGGER_HEADER) == token:
+        return True
+    if requested_by_admin(request):
+        return True
+    return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def install_silk_sql_hook():
+    """
+    Silk patches SQLCompiler.execute_sql, for all threads, the first time it profiles a request
+    and never unpatches it, which makes every later query pay for an extra as_sql(). Swapping
+    the original back after each profiled request would race with the other threads, so the
+    hook is installed once and only passes the queries of profiled requests through silk.
+    Silk sees `_execute_sql` set and leaves the class alone.
+    """
+    if hasattr(SQLCompiler, '_execute_sql'):
+        return
+    original = SQLCompiler.execute_sql
+
+    def execute_sql(self, *args, **kwargs):
+        if _profiling.get():
+            return silk_execute_sql(self, *args, **kwargs)
+        return original(self, *args, **kwargs)
+
+    SQLCompiler._execute_sql = original
+    SQLCompiler.execute_sql = execute_sql
+
+
+def recent_slow_requests():
+    """The kept slow requests, newest first."""
+    with _slow_requests_lock:
+        return list(reversed(slow_requests))
+
+
+def record_slow_request(request, response, duration_ms, profiled):
+    with _slow_requests_lock:
+        slow_requests.append({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 1),
+            'profiled': profiled,
+            'at': timezone.now().isoformat(),
+        })
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.silk = SilkyMiddleware(get_response)
+        install_silk_sql_hook()
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        profiled = should_profile(request)
+        if profiled:
+            token = _profiling.set(True)
+            try:
+                response = self.silk(request)
+            finally:
+                _profiling.reset(token)
+                DataCollector().clear()
+        else:
+            response = self.get_response(request)
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= settings.PROFILING_SLOW_MS:
+            record_slow_request(request, response, duration_ms, profiled)
+        return response
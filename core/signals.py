@@ -0,0 +1,15 @@
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import db
+
+
+@receiver(connection_created)
+def count_connect(sender, connection, **kwargs):
+    db.count_connect(connection.alias)
+
+
+@receiver(request_started)
+def count_request(sender, **kwargs):
+    db.count_request()
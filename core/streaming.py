@@ -0,0 +1,33 @@
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(row, cls=JSONEncoder))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_json_array(rows, batch_size=500):
+    """
+    Encode an iterable of dicts as one JSON array, a batch of rows per chunk, without
+    ever holding more than `batch_size` encoded rows in memory.
+    """
+    yield '['
+    separator = ''
+    for batch in _batches(rows, batch_size):
+        yield separator + ','.join(batch)
+        separator = ','
+    yield ']'
+
+
+def stream_ndjson(rows, batch_size=500):
+    """Encode an iterable of dicts as newline delimited JSON, one object per line."""
+    for batch in _batches(rows, batch_size):
+        yield '\n'.join(batch) + '\n'
@@ -0,0 +1,23 @@
+"""
+Background tasks run through core.jobs. They take ids rather than instances and
+raise on failure so the job is retried.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from accounts.models import UserProfile
+from .utils import send_approval_notification
+
+
+def send_approval_email(seller_id):
+    seller = UserProfile.objects.select_related('user').get(id=seller_id)
+    send_approval_notification(seller)
+
+
+def send_password_reset_email(email, reset_url):
+    send_mail(
+        subject='Reset your password',
+        message=f'Please use the following link to reset your password: {reset_url}',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+    )
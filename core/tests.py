@@ -1,3 +1,292 @@
-from django.test import TestCase
+import importlib
+import os
+import sys
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import mail
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.sql.compiler import SQLCompiler
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from silk.models import Request as SilkRequest, SQLQuery as SilkQuery
+
+from accounts.tests import BaseTestCase
+from listings import cache as listing_cache
+from listings.models import SolarSolution, SolutionType
+from pricelist.models import Panel
+from .db import connection_metrics, connection_settings
+from .db_router import REPLICA, reading_from_replica
+from .jobs import enqueue, claim_jobs, run_job
+from .models import Job
+from .profiling import slow_requests
+
+calls = []
+
+
+def record_call(**kwargs):
+    calls.append(kwargs)
+
+
+def always_fail():
+    raise ConnectionError('SMTP is down')
+
+
+@override_settings(JOBS_RUN_INLINE=False, JOBS_MAX_ATTEMPTS=3, JOBS_RETRY_DELAY=10)
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_runs_due_jobs(self):
+        job = enqueue(record_call, value=1)
+        enqueue(record_call, delay=60, value=2)
+
+        call_command('run_jobs', once=True, stdout=StringIO())
+
+        self.assertEqual(calls, [{'value': 1}])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(Job.objects.filter(status=Job.Status.PENDING).count(), 1)
+
+    def test_failures_back_off_then_go_dead(self):
+        job = enqueue(always_fail)
+
+        for attempt in range(1, 4):
+            Job.objects.filter(id=job.id).update(run_at=timezone.now())
+            [claimed] = claim_jobs()
+            before = timezone.now()
+            self.assertFalse(run_job(claimed))
+
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn('SMTP is down', job.last_error)
+            if attempt < 3:
+                self.assertEqual(job.status, Job.Status.PENDING)
+                self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10 * 2 ** (attempt - 1)))
+
+        self.assertEqual(job.status, Job.Status.DEAD)
+        self.assertEqual(claim_jobs(), [])
+
+    def test_stale_running_jobs_are_claimed_again(self):
+        job = enqueue(record_call)
+        claim_jobs()
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        [claimed] = claim_jobs()
+
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.attempts, 2)
+
+    @override_settings(JOBS_RUN_INLINE=True)
+    def test_inline_mode_runs_immediately(self):
+        job = enqueue('core.tasks.send_password_reset_email', email='a@example.com', reset_url='http://x/')
+
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0.0, PROFILING_TRIGGER_TOKEN='let-me-profile', PROFILING_SLOW_MS=10_000)
+class ProfilingMiddlewareTestCase(BaseTestCase):
+    url = '/api/listings/solar-solutions/'
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials()
+        slow_requests.clear()
+        caches['shared'].clear()  # so the profiled requests query the database
+
+    def test_unsampled_requests_write_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+
+        self.assertFalse(SilkRequest.objects.exists())
+        self.assertFalse(any('silk_' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(SilkQuery.objects.exists())
+
+    def test_trigger_header_profiles_one_request(self):
+        self.client.get(self.url, HTTP_X_PROFILE='let-me-profile')
+        self.client.get(self.url, HTTP_X_PROFILE='wrong')
+
+        [profiled] = SilkRequest.objects.all()
+        self.assertTrue(profiled.queries.exists())
+        self.assertEqual(SilkQuery.objects.exclude(request=profiled).count(), 0)
+
+    def test_sql_hook_stays_installed_and_is_gated_per_request(self):
+        hook = SQLCompiler.execute_sql
+        self.client.get(self.url, HTTP_X_PROFILE='let-me-profile')
+        self.assertIs(SQLCompiler.execute_sql, hook)
+
+        with mock.patch('core.profiling.silk_execute_sql') as silk_execute_sql:
+            SolarSolution.objects.count()
+        silk_execute_sql.assert_not_called()
+
+    def test_admins_can_profile_with_a_query_param(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        self.client.get(self.url, {'profile': '1'})
+        self.assertEqual(SilkRequest.objects.count(), 0)
+
+        self.authenticate_user(email='admin@example.com', role='admin')
+        self.client.get(self.url, {'profile': '1'})
+        self.assertEqual(SilkRequest.objects.count(), 1)
+
+    @override_settings(PROFILING_SLOW_MS=0)
+    def test_slow_requests_are_kept_for_admins(self):
+        self.client.get(self.url)
+        self.authenticate_user(email='admin@example.com', role='admin')
+
+        response = self.client.get(reverse('slow-requests'))
+
+        self.assertEqual(response.data[-1]['path'], self.url)
+        self.assertFalse(response.data[-1]['profiled'])
+
+
+class ConnectionSettingsTestCase(SimpleTestCase):
+    def test_persistent_connections_are_health_checked(self):
+        database = connection_settings({'ENGINE': 'django.db.backends.postgresql'}, max_age=300)
+
+        self.assertEqual(database['CONN_MAX_AGE'], 300)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('OPTIONS', database)
+
+    def test_pool_is_sized_per_worker(self):
+        database = connection_settings({'OPTIONS': {'sslmode': 'require'}}, pool=True, pool_min_size=1,
+                                       pool_max_size=4)
+
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS'], {'sslmode': 'require',
+                                               'pool': {'min_size': 1, 'max_size': 4, 'timeout': 10}})
+
+    def test_production_settings_keep_connections_open(self):
+        environ = {'PRODUCTION_DB_NAME': 'cosmic', 'DB_USER': 'cosmic', 'DB_PASSWORD': 'secret', 'DB_HOST': 'db'}
+        with mock.patch.dict(os.environ, environ):
+            try:
+                settings_prod = importlib.import_module('cosmic_server7.settings_prod')
+            finally:
+                sys.modules.pop('cosmic_server7.settings_prod', None)
+
+        database = settings_prod.DATABASES['default']
+        self.assertEqual(database['NAME'], 'cosmic')
+        self.assertGreater(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+
+
+@override_settings(CACHES={alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+                           for alias in ('default', 'shared')})
+class ConnectionReuseTestCase(TransactionTestCase):
+    """Requests go through the WSGI handler, which closes old connections around every request."""
+    databases = '__all__'
+    url = '/api/listings/solar-solutions/'
+
+    def serve(self, count):
+        handler = WSGIHandler()
+        for _ in range(count):
+            caches['shared'].clear()  # so every request reads the listings from the database
+            response = handler(RequestFactory().get(self.url).environ, lambda status, headers: None)
+            self.assertEqual(response.status_code, 200)
+            response.close()
+
+    def closes(self, requests, **settings_dict):
+        """How often the connection is closed around `requests` requests with these settings."""
+        connection.ensure_connection()
+        # Closing the in-memory test database does nothing, so the closes are counted instead of
+        # the reconnects they would cause. close_at is set the way connect() sets it.
+        with mock.patch.dict(connection.settings_dict, settings_dict), \
+                mock.patch.object(connection, 'close') as close:
+            max_age = connection.settings_dict['CONN_MAX_AGE']
+            connection.close_at = None if max_age is None else time.monotonic() + max_age
+            self.serve(requests)
+        return close.call_count
+
+    def test_connections_are_reused_across_requests(self):
+        requests = connection_metrics()['requests']
+
+        self.assertEqual(self.closes(3, **connection_settings({})), 0)
+        self.assertEqual(connection_metrics()['requests'], requests + 3)
+
+    def test_connections_are_closed_after_every_request_without_max_age(self):
+        self.assertGreaterEqual(self.closes(3, **connection_settings({}, max_age=0)), 3)
+
+
+class DatabaseMetricsViewTestCase(BaseTestCase):
+    def test_admins_see_connection_metrics(self):
+        self.authenticate_user(email='admin@example.com', role='admin')
+
+        response = self.client.get(reverse('db-connections'))
+
+        self.assertEqual(response.status_code, 200)
+        default = response.data['databases']['default']
+        self.assertTrue(default['health_checks'])
+        self.assertIsNone(default['pool'])
+
+    def test_sellers_are_refused(self):
+        self.assertEqual(self.client.get(reverse('db-connections')).status_code, 403)
+
+
+@skipUnless(REPLICA in settings.DATABASES, 'Needs DATABASE_REPLICA_URL, e.g. a second SQLite file.')
+@override_settings(REPLICA_LAG_CHECK_INTERVAL=0, CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'replica-tests'},
+})
+class ReplicaRoutingTestCase(BaseTestCase):
+    """
+    The replica is a separate, empty test database here, so rows created on the primary show
+    which database a request read from:
+
+        DATABASE_REPLICA_URL=sqlite:////tmp/replica.sqlite3 python manage.py test core.tests.ReplicaRoutingTestCase
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        caches['shared'].clear()
+        super().setUp()
+        self.url = reverse('panel-my-panels')
+        self.panel = Panel.objects.create(seller=self.user_profile, brand_name='Primary', specification='Mono',
+                                          capacity=100, unit='watt', price=100)
+        lag = mock.patch('core.db_router.measure_replica_lag', return_value=0)
+        self.measure_replica_lag = lag.start()
+        self.addCleanup(lag.stop)
+
+    def panel_ids(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.panel_ids(), [])
+        self.assertFalse(reading_from_replica())
+
+    def test_writers_read_their_writes(self):
+        response = self.client.patch(reverse('panel-detail', args=[self.panel.id]), {'price': 120}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.panel_ids(), [self.panel.id])
+
+    def test_lagging_or_unreachable_replica_falls_back_to_the_primary(self):
+        for lag in (settings.REPLICA_MAX_LAG + 1, None):
+            with self.subTest(lag=lag):
+                self.measure_replica_lag.return_value = lag
+                self.assertEqual(self.panel_ids(), [self.panel.id])
+
+    def test_anonymous_listings_read_the_primary_right_after_a_change(self):
+        self.client.credentials()
+        solution = SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                                seller=self.user_profile)
+        url = reverse('solar-solution-list')
+
+        response = self.client.get(url)
+        self.assertEqual([item['id'] for item in response.data['results']], [solution.id])
+
+        state = listing_cache.get_state()
+        listing_cache.get_cache().set(listing_cache.STATE_KEY, {
+            'generation': 'settled', 'last_modified': state['last_modified'] - timedelta(minutes=1),
+        }, None)
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'], [])
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import DatabaseMetricsView, SlowRequestsView
+
+urlpatterns = [
+    path('slow-requests/', SlowRequestsView.as_view(), name='slow-requests'),
+    path('db-connections/', DatabaseMetricsView.as_view(), name='db-connections'),
+]
@@ -1,3 +1,23 @@
-from django.shortcuts import render
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from accounts.permissions import IsAdmin
+from .db import connection_metrics
+from .profiling import recent_slow_requests
+
+
+class SlowRequestsView(APIView):
+    """The slowest recent requests served by this worker process, newest first."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(recent_slow_requests(), status=status.HTTP_200_OK)
+
+
+class DatabaseMetricsView(APIView):
+    """Connection reuse and pool saturation of this worker process."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(connection_metrics(), status=status.HTTP_200_OK)
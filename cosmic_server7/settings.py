@@ -4,6 +4,8 @@ from pathlib import Path
 import dj_database_url
 from decouple import config
 
+from core.db import connection_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -24,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # 3rd party
     'rest_framework',
@@ -46,7 +49,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -71,11 +74,13 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=config('JWT_REFRESH_TOKEN_LIFETIME', cast=int, default=7)),
     'ROTATE_REFRESH_TOKENS': config('JWT_ROTATE_REFRESH_TOKENS', cast=bool, default=True),
     'BLACKLIST_AFTER_ROTATION': config('JWT_BLACKLIST_AFTER_ROTATION', cast=bool, default=True),
+    # Re-reads the role claims (accounts.authentication) into every refreshed access token
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.RoleTokenRefreshSerializer',
 }
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
-    'silk.middleware.SilkyMiddleware',
+    'core.profiling.ProfilingMiddleware',  # sampled silk profiling, see PROFILING_* below
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -83,6 +88,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db_router.ReplicaStickinessMiddleware',  # read-your-writes with a read replica
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -107,14 +113,41 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'cosmic_server7.wsgi.application'
 
+# Database connections (core.db): kept open and health checked between requests, or taken from
+# a psycopg pool with DB_POOL (needs psycopg 3 and psycopg_pool). The pool sizes are per worker process.
+DATABASE_CONNECTIONS = {
+    'max_age': config('DB_CONN_MAX_AGE', cast=int, default=600),  # seconds, 0 closes after every request
+    'health_checks': config('DB_CONN_HEALTH_CHECKS', cast=bool, default=True),
+    'pool': config('DB_POOL', cast=bool, default=False),
+    'pool_min_size': config('DB_POOL_MIN_SIZE', cast=int, default=2),
+    'pool_max_size': config('DB_POOL_MAX_SIZE', cast=int, default=10),
+    'pool_timeout': config('DB_POOL_TIMEOUT', cast=float, default=10),  # seconds to wait for a free connection
+}
+
+# Optional read replica (core.db_router), only read by views with ReplicaReadMixin
+REPLICA_DATABASES = {}
+if config('DATABASE_REPLICA_URL', default=''):
+    REPLICA_DATABASES['replica'] = connection_settings(dj_database_url.parse(config('DATABASE_REPLICA_URL')),
+                                                       **DATABASE_CONNECTIONS)
+    # A Postgres standby is read-only, its tests use the primary's test database. Two SQLite
+    # files stay separate so the routing itself can be tested.
+    if REPLICA_DATABASES['replica']['ENGINE'] != 'django.db.backends.sqlite3':
+        REPLICA_DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
 # Default Database: PostgreSQL
 DATABASES = {
-    'default': dj_database_url.config(
+    'default': connection_settings(
         # Replace this value with your local database's connection string.
-        default=config('DATABASE_URL'),
-        conn_max_age=600
-    )
+        dj_database_url.config(default=config('DATABASE_URL')),
+        **DATABASE_CONNECTIONS
+    ),
+    **REPLICA_DATABASES,
 }
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_CACHE_ALIAS = 'shared'
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', cast=int, default=10)  # primary only after a write
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', cast=float, default=5)  # seconds, the primary is read beyond it
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', cast=float, default=5)  # seconds, per process
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -161,9 +194,18 @@ SWAGGER_SETTINGS = {
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',  # In-memory cache
-    }
+    },
+    # Shared by every gunicorn worker (e.g. django.core.cache.backends.redis.RedisCache in production)
+    'shared': {
+        'BACKEND': config('SHARED_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('SHARED_CACHE_LOCATION', default=os.path.join(BASE_DIR, '.cache')),
+    },
 }
 
+# Anonymous listing responses, invalidated whenever a listing, its service, media or approval is saved
+LISTING_CACHE_ALIAS = 'shared'
+LISTING_CACHE_TIMEOUT = config('LISTING_CACHE_TIMEOUT', cast=int, default=300)
+
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME'),
     'API_KEY': config('CLOUDINARY_API_KEY'),
@@ -172,7 +214,8 @@ CLOUDINARY_STORAGE = {
 
 STORAGES = {
     "default": {
-        "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
+        # django.core.files.storage.FileSystemStorage keeps uploads in MEDIA_ROOT, e.g. to work offline
+        "BACKEND": config('MEDIA_STORAGE_BACKEND', default="cloudinary_storage.storage.MediaCloudinaryStorage"),
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -219,6 +262,39 @@ TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN')
 TWILIO_WHATSAPP_NUMBER = config('TWILIO_WHATSAPP_NUMBER')
 TWILIO_CONTENT_SID = config('TWILIO_CONTENT_SID')
+TWILIO_TIMEOUT = config('TWILIO_TIMEOUT', cast=float, default=5)  # seconds, per HTTP request
+
+# Outbound WhatsApp messages (operations.messaging)
+MESSAGING_TRANSPORT = config('MESSAGING_TRANSPORT', default='operations.messaging.TwilioTransport')
+MESSAGING_FAILURE_THRESHOLD = config('MESSAGING_FAILURE_THRESHOLD', cast=int, default=5)
+MESSAGING_RESET_TIMEOUT = config('MESSAGING_RESET_TIMEOUT', cast=int, default=30)  # seconds the circuit stays open
+
+# Request profiling (core.profiling): silk only records sampled or explicitly triggered requests
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', cast=float, default=0.0)  # 0.01 profiles 1% of requests
+PROFILING_TRIGGER_HEADER = 'X-Profile'
+PROFILING_TRIGGER_TOKEN = config('PROFILING_TRIGGER_TOKEN', default='')  # empty disables the header trigger
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', cast=int, default=500)
+PROFILING_SLOW_BUFFER_SIZE = config('PROFILING_SLOW_BUFFER_SIZE', cast=int, default=100)
+# silk looks for its own middleware before @silk_profile does anything
+SILKY_MIDDLEWARE_CLASS = 'core.profiling.ProfilingMiddleware'
+
+# Users behind JWT claims (accounts.authentication) when a request needs the full row
+AUTH_USER_CACHE_ALIAS = 'shared'
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', cast=int, default=60)  # seconds
+# Refresh token blacklist membership, see accounts.authentication.RoleRefreshToken
+JWT_BLACKLIST_CACHE_ALIAS = 'shared'
+
+# One-time codes for buyer verification (operations.otp), shared by all workers
+OTP_STORE = config('OTP_STORE', default='operations.otp.DatabaseOTPStore')
+OTP_CACHE_ALIAS = 'shared'  # used by operations.otp.CacheOTPStore
+OTP_TTL = config('OTP_TTL', cast=int, default=60)  # seconds
+OTP_MAX_ATTEMPTS = config('OTP_MAX_ATTEMPTS', cast=int, default=5)
+
+# Background jobs (core.jobs), run by `manage.py run_jobs`
+JOBS_RUN_INLINE = config('JOBS_RUN_INLINE', cast=bool, default=False)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', cast=int, default=5)
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', cast=int, default=30)  # seconds, doubled on every retry
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', cast=int, default=600)
 
 # Frontend BaseUrl
 FRONTEND_BASE_URL = config('FRONTEND_BASE_URL')
\ No newline at end of file
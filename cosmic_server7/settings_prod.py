@@ -1,12 +1,13 @@
 from .settings import *
 
 DATABASES = {
-    'default': {
+    'default': connection_settings({
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': config('PRODUCTION_DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT', default='5432'),
-    }
+    }, **DATABASE_CONNECTIONS),
+    **REPLICA_DATABASES,
 }
@@ -33,6 +33,7 @@ urlpatterns = [
     path('api/operations/', include('operations.urls')),
     path('api/pricing/', include('pricing.urls')),
     path('api/pricelist/', include('pricelist.urls')),
+    path('api/core/', include('core.urls')),
 ]
 
 if settings.DEBUG:
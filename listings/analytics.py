@@ -0,0 +1,155 @@
+"""
+Rollups behind the admin analytics endpoint: one AnalyticsRollup row per company city and day.
+
+Writes keep them current. A new buyer interaction increments its row inside the same
+transaction. Any other change to a seller, company, solution, approval or interaction marks
+the days it touches, and those days are recomputed from the raw tables once the transaction
+commits (see listings.signals), one recount per committed transaction. `manage.py rebuild_analytics_rollups` recomputes everything,
+or only the last few days as a periodic job, and `manage.py check_analytics_rollups` compares
+the rollups with the raw tables.
+"""
+import threading
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from accounts.models import Company, UserProfile
+from .models import AnalyticsRollup, SolarSolution, BuyerInteraction
+
+COUNTERS = ('sellers', 'solutions', 'approved_solutions', 'unapproved_solutions', 'buyer_interactions')
+
+_pending = threading.local()
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def compute_rollups(days=None):
+    """Counters from the raw tables as {(city, day): {counter: count}}, for `days` only if given."""
+    created_on_days = Q()
+    for day in days or ():
+        start, end = day_bounds(day)
+        created_on_days |= Q(created__gte=start, created__lt=end)
+
+    def grouped(queryset, city_field):
+        return queryset.filter(created_on_days).values(
+            city=Coalesce(city_field, Value('')),
+            day=TruncDate('created'),
+        )
+
+    rollups = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    sellers = grouped(UserProfile.objects.filter(role=UserProfile.Role.SELLER), 'company__city')
+    for row in sellers.annotate(count=Count('id')):
+        rollups[row['city'], row['day']]['sellers'] = row['count']
+
+    solutions = grouped(SolarSolution.objects.all(), 'seller__company__city').annotate(
+        count=Count('id'),
+        approved=Count('id', filter=Q(approval__admin_verified=True)),
+        unapproved=Count('id', filter=Q(approval__admin_verified=False)),
+    )
+    for row in solutions:
+        rollup = rollups[row['city'], row['day']]
+        rollup['solutions'] = row['count']
+        rollup['approved_solutions'] = row['approved']
+        rollup['unapproved_solutions'] = row['unapproved']
+
+    interactions = grouped(BuyerInteraction.objects.all(), 'solar_solution__seller__company__city')
+    for row in interactions.annotate(count=Count('id')):
+        rollups[row['city'], row['day']]['buyer_interactions'] = row['count']
+    return rollups
+
+
+def all_days():
+    """Every day with a seller, solution, interaction or rollup row."""
+    days = set(AnalyticsRollup.objects.values_list('day', flat=True).distinct())
+    for queryset in (UserProfile.objects.filter(role=UserProfile.Role.SELLER), SolarSolution.objects.all(),
+                     BuyerInteraction.objects.all()):
+        days.update(moment.date() for moment in queryset.datetimes('created', 'day'))
+    return days
+
+
+def _replace(days, count_all=False):
+    """Recompute the rollups of `days` (counting every day when `count_all`) and write them."""
+    cities = {'', *(city for city in Company.objects.values_list('city', flat=True).distinct() if city)}
+    with transaction.atomic():
+        # Every key of these days gets a row, locked before counting: an interaction recorded
+        # meanwhile waits for this transaction and then increments the recomputed row, also on
+        # a key that had no row yet
+        AnalyticsRollup.objects.bulk_create([AnalyticsRollup(city=city, day=day) for city in cities for day in days],
+                                            batch_size=500, ignore_conflicts=True)
+        locked = {
+            (city, day): pk for pk, city, day in AnalyticsRollup.objects.select_for_update().filter(
+                day__in=days).order_by('id').values_list('id', 'city', 'day')
+        }
+        rollups = compute_rollups(None if count_all else days)
+        # An upsert, a company may have moved to a city that got no row above
+        AnalyticsRollup.objects.bulk_create(
+            [AnalyticsRollup(city=city, day=day, **counters) for (city, day), counters in rollups.items()],
+            batch_size=500, update_conflicts=True, unique_fields=['city', 'day'], update_fields=COUNTERS,
+        )
+        AnalyticsRollup.objects.filter(id__in=[pk for key, pk in locked.items() if key not in rollups]).delete()
+    return rollups
+
+
+def refresh_days(days):
+    """
+    Recompute whole days from the raw tables. The save hooks call this once per transaction
+    (see schedule_refresh), so a loop of saves in autocommit recomputes the day on every
+    save: wrap bulk changes in one transaction.
+    """
+    days = set(days)
+    if not days:
+        return
+    _replace(days)
+
+
+def rebuild():
+    return len(_replace(all_days(), count_all=True))
+
+
+def check():
+    """Differences between the rollups and the raw tables as (city, day, counter, expected, actual)."""
+    expected = compute_rollups()
+    actual = {
+        (row.city, row.day): {counter: getattr(row, counter) for counter in COUNTERS}
+        for row in AnalyticsRollup.objects.all()
+    }
+    zero = dict.fromkeys(COUNTERS, 0)
+    differences = []
+    for city, day in sorted(expected.keys() | actual.keys()):
+        expected_counters = expected.get((city, day), zero)
+        actual_counters = actual.get((city, day), zero)
+        for counter in COUNTERS:
+            if expected_counters[counter] != actual_counters[counter]:
+                differences.append((city, day, counter, expected_counters[counter], actual_counters[counter]))
+    return differences
+
+
+def schedule_refresh(*moments):
+    """Recompute the days of these datetimes once the current transaction commits, each day once."""
+    days = getattr(_pending, 'days', None)
+    if days is None:
+        days = _pending.days = set()
+    days.update(timezone.localdate(moment) for moment in moments if moment)
+    # robust: a failed refresh is logged, it mustn't fail the request whose writes already committed
+    transaction.on_commit(flush_pending, robust=True)
+
+
+def flush_pending():
+    days, _pending.days = getattr(_pending, 'days', None), set()
+    if days:
+        refresh_days(days)
+
+
+def record_interaction(interaction):
+    city = SolarSolution.objects.filter(id=interaction.solar_solution_id).values_list(
+        Coalesce('seller__company__city', Value('')), flat=True
+    ).first()
+    rollup, _ = AnalyticsRollup.objects.get_or_create(city=city or '', day=timezone.localdate(interaction.created))
+    AnalyticsRollup.objects.filter(id=rollup.id).update(buyer_interactions=F('buyer_interactions') + 1)
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+STATE_KEY = 'listings:state'
+
+# Query params that change the anonymous listing response, anything else is ignored for the cache key
+PAGINATION_PARAMS = ('ordering', 'page', 'pagination', 'cursor')
+
+
+def get_cache():
+    return caches[settings.LISTING_CACHE_ALIAS]
+
+
+def get_state():
+    """
+    The current cache generation and when it started. Every invalidation starts a new
+    generation, so stale entries are never read again and simply expire.
+    """
+    cache = get_cache()
+    state = cache.get(STATE_KEY)
+    if state is None:
+        cache.add(STATE_KEY, {'generation': uuid.uuid4().hex, 'last_modified': timezone.now()}, None)
+        state = cache.get(STATE_KEY)
+    return state
+
+
+def invalidate(**kwargs):
+    get_cache().set(STATE_KEY, {'generation': uuid.uuid4().hex, 'last_modified': timezone.now()}, None)
+
+
+def normalize_params(query_params, allowed):
+    # Values are kept as sent, the filters validate them (e.g. `city=isb` is a 400, `city=ISB` is not)
+    return urlencode([(key, query_params[key]) for key in sorted(allowed) if query_params.get(key)])
+
+
+def cache_key(request, generation, allowed_params):
+    params = normalize_params(request.query_params, allowed_params)
+    # The host ends up in the pagination links, so it is part of the key
+    digest = hashlib.md5(f'{request.get_host()}?{params}'.encode()).hexdigest()
+    return f'listings:list:{generation}:{digest}'
+
+
+def cached_list_response(request, allowed_params, build_response):
+    """
+    Serve an anonymous listing page from the shared cache, with ETag/Last-Modified so
+    clients polling the same page get a 304 instead of the body.
+    """
+    cache = get_cache()
+    state = get_state()
+    key = cache_key(request, state['generation'], allowed_params)
+
+    entry = cache.get(key)
+    if entry is None:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+        body = json.dumps(response.data, cls=JSONEncoder, sort_keys=True).encode()
+        entry = {
+            'data': response.data,
+            'etag': f'"{hashlib.md5(body).hexdigest()}"',
+            'last_modified': int(state['last_modified'].timestamp()),
+        }
+        cache.set(key, entry, settings.LISTING_CACHE_TIMEOUT)
+
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+    if response is None:
+        response = Response(entry['data'])
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    return response
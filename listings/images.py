@@ -0,0 +1,116 @@
+"""
+Resized, metadata-free variants of SolutionMedia images.
+
+Every upload is decoded once with Pillow, turned upright from its EXIF orientation and
+rendered at each size in `VARIANTS` as WebP and JPEG. The variants are written without EXIF,
+GPS or ICC data, to the default storage (Cloudinary in production, a FileSystemStorage with
+`MEDIA_STORAGE_BACKEND` locally). Their URLs and dimensions are recorded in
+`SolutionMedia.variants`:
+
+    {"card": {"width": 800, "height": 600, "webp": "<url>", "jpeg": "<url>"}, ...}
+"""
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Longest edge in pixels, images are never upscaled
+VARIANTS = {
+    'thumbnail': 320,
+    'card': 800,
+    'full': 1920,
+}
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+ACCEPTED_FORMATS = {'JPEG', 'MPO', 'PNG', 'WEBP', 'GIF', 'BMP', 'TIFF'}
+MAX_PIXELS = 50_000_000
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def open_image(file):
+    """
+    Identify an uploaded file from its header, raising InvalidImage for anything that isn't a
+    reasonable photo. The pixels are only decoded by `render_variants`, off the request.
+    """
+    file.seek(0)
+    try:
+        image = Image.open(file)
+        if image.format not in ACCEPTED_FORMATS:
+            raise InvalidImage(f'Unsupported image format {image.format}.')
+        if image.width * image.height > MAX_PIXELS:
+            raise InvalidImage('The image is too large.')
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        raise InvalidImage('Upload a valid image.') from exc
+    finally:
+        file.seek(0)
+    return image
+
+
+def decode_image(file):
+    image = open_image(file)
+    try:
+        image.load()
+    except OSError as exc:  # truncated or corrupt pixel data
+        raise InvalidImage('Upload a valid image.') from exc
+    return image
+
+
+def normalize(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        # Neither JPEG nor the photos on the site need transparency, flatten it on white
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_variants(file):
+    """
+    Yield (variant, extension, width, height, bytes) for every size and format. Pillow only
+    writes metadata it is given, so nothing of the original's EXIF survives.
+    """
+    image = normalize(decode_image(file))
+    for variant, edge in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        for extension, (pillow_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pillow_format, **options)
+            yield variant, extension, resized.width, resized.height, buffer.getvalue()
+
+
+def variant_name(media_id, variant, extension):
+    return f'solution_images/variants/{media_id}/{variant}.{extension}'
+
+
+def process_media(media, storage=default_storage):
+    """Render and store the variants of `media.image` and record them on the instance."""
+    variants = {}
+    with media.image.open('rb') as file:
+        for variant, extension, width, height, data in render_variants(file):
+            name = variant_name(media.id, variant, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(data))
+            variants.setdefault(variant, {'width': width, 'height': height})[extension] = storage.url(name)
+
+    type(media).objects.set_status(media, media.Status.READY, variants)
+    return variants
+
+
+def delete_variants(media_id, storage=default_storage):
+    for variant in VARIANTS:
+        for extension in FORMATS:
+            name = variant_name(media_id, variant, extension)
+            if storage.exists(name):
+                storage.delete(name)
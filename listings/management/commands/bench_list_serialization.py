@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+from django.test import override_settings
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import rolled_back, median_ms
+from listings.models import SolarSolution, SolutionMedia, BuyerInteraction
+from listings.seed import seed_marketplace
+from listings.serializers import PublicSolarSolutionListSerializer, SolarSolutionListSerializer
+
+
+def seed_media_and_interactions(interactions):
+    variants = {name: {'width': width, 'height': width, 'webp': f'/media/bench/{name}.webp',
+                       'jpeg': f'/media/bench/{name}.jpeg'}
+                for name, width in (('thumbnail', 320), ('card', 800), ('full', 1920))}
+    solution_ids = list(SolarSolution.objects.values_list('id', flat=True))
+    SolutionMedia.objects.bulk_create(
+        [SolutionMedia(solution_id=pk, image=f'solutions/bench-{pk}.jpg', is_display_image=True, variants=variants,
+                       status=SolutionMedia.Status.READY) for pk in solution_ids],
+        batch_size=1000,
+    )
+    SolarSolution.objects.update(display_image_id=Subquery(
+        SolutionMedia.objects.filter(solution_id=OuterRef('pk')).values('id')[:1]))
+    BuyerInteraction.objects.bulk_create(
+        [BuyerInteraction(solar_solution_id=pk, whatsapp_number=f'+92300{number:07d}')
+         for pk in solution_ids for number in range(interactions)],
+        batch_size=1000,
+    )
+    SolarSolution.objects.update(interaction_count=interactions)
+
+
+class Command(BaseCommand):
+    help = ("Compare one listing page serialized from model instances with the values() rows the list view "
+            "uses, for the public and the seller/admin serializer.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solutions', type=int, default=1000)
+        parser.add_argument('--interactions', type=int, default=3, help="Buyer interactions per solution.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_size = api_settings.PAGE_SIZE
+        request = APIRequestFactory().get('/api/listings/solar-solutions/')
+        context = {'request': request}
+
+        with override_settings(ALLOWED_HOSTS=['*']), rolled_back():
+            seed_marketplace(solutions=options['solutions'], sellers=30)
+            seed_media_and_interactions(options['interactions'])
+
+            public = SolarSolution.objects.select_related('seller__company', 'display_image').order_by('id')
+            private = public.select_related('approval').prefetch_related('interactions')
+
+            results = []
+            for label, serializer_class, instances in (
+                ('public', PublicSolarSolutionListSerializer, public),
+                ('seller/admin', SolarSolutionListSerializer, private),
+            ):
+                rows = serializer_class.row_values(SolarSolution.objects.order_by('id'))
+
+                def from_instances():
+                    return serializer_class(instances[:page_size], many=True, context=context).data
+
+                def from_rows():
+                    return serializer_class(context=context).represent_rows(rows[:page_size])
+
+                assert from_instances() == from_rows()
+                results.append((label, median_ms(from_instances, repeat=options['repeat']),
+                                median_ms(from_rows, repeat=options['repeat'])))
+
+        self.stdout.write(f'{page_size} solutions per page, queries included')
+        for label, instances_ms, rows_ms in results:
+            self.stdout.write(f'{label:<14} instances {instances_ms:8.2f} ms   rows {rows_ms:8.2f} ms   '
+                              f'{instances_ms / rows_ms:5.1f}x')
@@ -0,0 +1,57 @@
+from urllib.parse import urlparse, parse_qs
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import rolled_back, median_ms
+from listings.seed import seed_marketplace
+from listings.views import SolarSolutionViewSet
+
+
+class Command(BaseCommand):
+    help = "Compare page-1 and deep-page latency of the listing endpoint for page-number and cursor pagination."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=100, help="Deep page to measure against page 1.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--ordering', default='-created',
+                            help="Ordering used for both modes, e.g. -created or price.")
+
+    def handle(self, *args, **options):
+        page = options['page']
+        page_size = api_settings.PAGE_SIZE
+        factory = APIRequestFactory()
+        view = SolarSolutionViewSet.as_view({'get': 'list'})
+
+        def fetch(params):
+            response = view(factory.get('/api/listings/solar-solutions/', params))
+            assert response.status_code == 200, response.status_code
+            return response
+
+        with override_settings(ALLOWED_HOSTS=['*']), rolled_back():
+            # One extra page so the deep page is full
+            seed_marketplace(solutions=page_size * (page + 1), sellers=30)
+
+            ordering = options['ordering']
+            results = []
+
+            for label, params in (
+                ('page-number p1', {'ordering': ordering, 'page': 1}),
+                (f'page-number p{page}', {'ordering': ordering, 'page': page}),
+            ):
+                results.append((label, median_ms(lambda: fetch(params), repeat=options['repeat'])))
+
+            # Walk the cursor links once to find the cursor for the deep page
+            first_params = {'ordering': ordering, 'pagination': 'cursor'}
+            cursor_params = dict(first_params)
+            for _ in range(page - 1):
+                next_link = fetch(cursor_params).data['next']
+                cursor_params = dict(first_params, cursor=parse_qs(urlparse(next_link).query)['cursor'][0])
+
+            results.append(('cursor p1', median_ms(lambda: fetch(first_params), repeat=options['repeat'])))
+            results.append((f'cursor p{page}', median_ms(lambda: fetch(cursor_params), repeat=options['repeat'])))
+
+        for label, elapsed in results:
+            self.stdout.write(f'{label:<20} {elapsed:8.2f} ms')
@@ -0,0 +1,131 @@
+import io
+import multiprocessing
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.authentication import RoleRefreshToken
+from accounts.models import UserProfile
+from core.jobs import claim_jobs, run_job
+from core.models import Job
+from listings.models import SolarSolution, SolutionMedia, SolutionType
+
+
+def make_photo(width, height):
+    # Noise compresses like a real photo, a flat color would make decoding unrealistically cheap
+    image = Image.effect_noise((width, height), 64).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def work(uploads_done):
+    """A run_jobs worker that exits once the uploads are done and the queue is empty."""
+    while True:
+        jobs = claim_jobs(limit=1)
+        for job in jobs:
+            run_job(job)
+        if not jobs:
+            if uploads_done.is_set():
+                break
+            time.sleep(0.05)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ("Time concurrent uploads through upload_media with the variants rendered inline "
+            "(JOBS_RUN_INLINE) and queued for run_jobs workers: request latency and images processed per "
+            "second. Uses a throwaway seller and a temporary media directory, run it against a PostgreSQL "
+            "database without other pending jobs (SQLite fails on concurrent writers).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=32)
+        parser.add_argument('--concurrency', type=int, default=8, help="Uploads in flight at once.")
+        parser.add_argument('--workers', type=int, default=4, help="run_jobs worker processes.")
+        parser.add_argument('--size', default='4000x3000', help="Photo dimensions, WIDTHxHEIGHT.")
+
+    def handle(self, *args, **options):
+        width, height = map(int, options['size'].split('x'))
+        photo = make_photo(width, height)
+
+        media_root = tempfile.mkdtemp()
+        user = get_user_model().objects.create_user(email='bench-media@example.com', password=None)
+        profile = UserProfile.objects.create(user=user, role=UserProfile.Role.SELLER)
+        solution = SolarSolution.objects.create(size=10, price=1_000_000, solution_type=SolutionType.HYBRID,
+                                                seller=profile)
+        token = str(RoleRefreshToken.for_user(user).access_token)
+        storage = override_settings(ALLOWED_HOSTS=['*'], MEDIA_ROOT=media_root, STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        with storage:
+            try:
+                with override_settings(JOBS_RUN_INLINE=True):
+                    inline = self.upload(solution, token, photo, options)
+                with override_settings(JOBS_RUN_INLINE=False):
+                    queued = self.upload_to_workers(solution, token, photo, options)
+            finally:
+                # Inside the override, deleting the media deletes its variants from the temporary storage
+                media_ids = list(SolutionMedia.objects.filter(solution=solution).values_list('id', flat=True))
+                Job.objects.filter(kwargs__media_id__in=media_ids).delete()
+                user.delete()
+                shutil.rmtree(media_root, ignore_errors=True)
+
+        self.stdout.write(f'{options["uploads"]} uploads of {width}x{height}, {options["concurrency"]} concurrent, '
+                          f'{options["workers"]} job workers')
+        self.stdout.write(f'{"mode":<8} {"p50 ms":>10} {"p95 ms":>10} {"images/s":>10}')
+        for label, (latencies, throughput) in (('inline', inline), ('queued', queued)):
+            p50 = statistics.median(latencies)
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else p50
+            self.stdout.write(f'{label:<8} {p50:10.1f} {p95:10.1f} {throughput:10.2f}')
+
+    def upload(self, solution, token, photo, options, workers=()):
+        """Latencies of the uploads and images per second until every one of them is processed."""
+        url = reverse('solar-solution-upload-media', args=[solution.id])
+        latencies = []
+
+        def request(number):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            start = time.perf_counter()
+            response = client.post(url, {'image': SimpleUploadedFile(f'bench-{number}.jpg', photo, 'image/jpeg')},
+                                   format='multipart')
+            latencies.append((time.perf_counter() - start) * 1000)
+            connections.close_all()  # the thread's own connection
+            assert response.status_code == 201, response.content
+
+        SolutionMedia.objects.filter(solution=solution).delete()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as requests:
+            list(requests.map(request, range(options['uploads'])))
+        while SolutionMedia.objects.filter(solution=solution, status=SolutionMedia.Status.PENDING).exists():
+            if workers and not any(worker.is_alive() for worker in workers):
+                raise CommandError('The job workers exited before every upload was processed.')
+            time.sleep(0.05)
+        return latencies, options['uploads'] / (time.perf_counter() - start)
+
+    def upload_to_workers(self, solution, token, photo, options):
+        # Forked workers inherit the settings overrides, but mustn't share this process's connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        uploads_done = context.Event()
+        workers = [context.Process(target=work, args=(uploads_done,)) for _ in range(options['workers'])]
+        for worker in workers:
+            worker.start()
+        try:
+            return self.upload(solution, token, photo, options, workers)
+        finally:
+            uploads_done.set()
+            for worker in workers:
+                worker.join()
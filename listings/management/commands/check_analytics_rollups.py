@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from listings import analytics
+
+
+class Command(BaseCommand):
+    help = "Compare the admin analytics rollups with the raw tables and fail if they differ."
+
+    def handle(self, *args, **options):
+        differences = analytics.check()
+        for city, day, counter, expected, actual in differences:
+            self.stdout.write(f'{city or "(no city)"} {day} {counter}: expected {expected}, found {actual}')
+        if differences:
+            raise CommandError(f'{len(differences)} rollup counters are out of date, '
+                               f'run `manage.py rebuild_analytics_rollups`.')
+        self.stdout.write(self.style.SUCCESS('Rollups match the raw tables.'))
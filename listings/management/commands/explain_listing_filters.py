@@ -0,0 +1,99 @@
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmark import rolled_back
+from listings.models import SolarSolution
+from listings.seed import seed_marketplace
+from listings.views import SolarSolutionViewSet
+
+# One representative value per SolarSolutionFilter parameter
+FILTER_PARAMS = {
+    'size': '10',
+    'price': 'below_1M',
+    'city': 'ISB',
+    'display_name': 'hybrid',
+    'approved': 'true',
+}
+
+# The indexes built for each filter (listings.models, accounts.models, operations.models)
+FILTER_INDEXES = {
+    'size': ('listings_solution_size_price', 'listings_solution_type_size'),
+    'price': ('listings_solution_price', 'listings_solution_size_price', 'listings_solution_type_size'),
+    'city': ('accounts_company_city_upper',),
+    'display_name': ('listings_solution_type_size',),
+    'approved': ('operations_approval_verified',),
+}
+# approved=true alone matches most listings (see listings.seed), reading the whole table is the
+# right plan for it and no index could beat that
+SEQ_SCAN_ALLOWED = {('approved',)}
+
+
+def filter_combinations():
+    names = list(FILTER_PARAMS)
+    for count in range(1, len(names) + 1):
+        for combination in combinations(names, count):
+            yield {name: FILTER_PARAMS[name] for name in combination}
+
+
+def check_plans(plans):
+    """
+    `plans` maps filter combinations (tuples of filter names) to their query plans. Returns the
+    combinations that read listings_solarsolution with a sequential scan (but those in
+    SEQ_SCAN_ALLOWED), and the filters whose index no plan uses.
+    """
+    sequential, used = [], set()
+    for names, plan in plans.items():
+        used.update(name for name in names if any(index in plan for index in FILTER_INDEXES[name]))
+        if 'Seq Scan on listings_solarsolution' in plan and names not in SEQ_SCAN_ALLOWED:
+            sequential.append(names)
+    return sequential, [name for name in FILTER_INDEXES if name not in used]
+
+
+def label(names):
+    return '&'.join(f'{name}={FILTER_PARAMS[name]}' for name in names)
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN the listing query for every combination of the hot filters on a seeded dataset, with the "
+            "planner's normal costs, and fail if one scans the solutions table sequentially or a filter's index "
+            "is never used (PostgreSQL only, other databases just print the plans).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solutions', type=int, default=20000)
+        parser.add_argument('--sellers', type=int, default=2000)
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every plan, not only failures.")
+
+    def handle(self, *args, **options):
+        plans = {}
+        with rolled_back():
+            seed_marketplace(solutions=options['solutions'], sellers=options['sellers'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            for params in filter_combinations():
+                filterset = SolarSolutionViewSet.SolarSolutionFilter(data=params, queryset=SolarSolution.objects.all())
+                if not filterset.is_valid():
+                    raise CommandError(f'Invalid filter parameters {params}: {filterset.errors}')
+                plans[tuple(params)] = filterset.qs.explain()
+
+        if connection.vendor != 'postgresql':
+            for names, plan in plans.items():
+                self.stdout.write(f'{label(names)}\n{plan}\n' if options['verbose_plans'] else label(names))
+            self.stdout.write(self.style.WARNING(
+                f'Plans are only checked on PostgreSQL, this database is {connection.vendor}.'))
+            return
+
+        sequential, unused = check_plans(plans)
+        for names, plan in plans.items():
+            if names in sequential or options['verbose_plans']:
+                self.stdout.write(f'{label(names)}\n{plan}\n')
+            else:
+                self.stdout.write(f'{label(names)}: ok')
+        if sequential or unused:
+            raise CommandError(
+                f'{len(sequential)} filter combinations fall back to a sequential scan of the solutions: '
+                f'{", ".join(map(label, sequential)) or "-"}. '
+                f'Filters whose index no plan used: {", ".join(unused) or "-"}.')
+        self.stdout.write(self.style.SUCCESS('Every filter is served by the index built for it.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.jobs import enqueue
+from listings.models import SolutionMedia
+from listings.tasks import process_solution_media
+
+
+class Command(BaseCommand):
+    help = "Queue variant rendering for media that has none yet, e.g. images uploaded before variants existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help="Also retry media whose processing failed.")
+
+    def handle(self, *args, **options):
+        statuses = [SolutionMedia.Status.PENDING]
+        if options['failed']:
+            statuses.append(SolutionMedia.Status.FAILED)
+
+        media_ids = list(SolutionMedia.objects.filter(status__in=statuses).exclude(image='').values_list('id', flat=True))
+        for media_id in media_ids:
+            enqueue(process_solution_media, media_id=media_id)
+        self.stdout.write(self.style.SUCCESS(f'Queued {len(media_ids)} media for processing.'))
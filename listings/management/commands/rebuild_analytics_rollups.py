@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from listings import analytics
+
+
+class Command(BaseCommand):
+    help = "Recompute the admin analytics rollups from the raw tables, all of them or only the last --days days."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Only refresh today and the days before it, e.g. --days 2 from a periodic job.")
+
+    def handle(self, *args, **options):
+        if options['days']:
+            today = timezone.localdate()
+            analytics.refresh_days(today - timedelta(days=offset) for offset in range(options['days']))
+            self.stdout.write(f"Refreshed the rollups of the last {options['days']} days.")
+        else:
+            count = analytics.rebuild()
+            self.stdout.write(f'Rebuilt {count} rollup rows.')
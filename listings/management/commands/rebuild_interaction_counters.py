@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from listings.models import BuyerInteraction
+
+
+class Command(BaseCommand):
+    help = "Recompute SolarSolution.interaction_count and UserProfile.buyers_count from the interaction rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', type=int, action='append', dest='seller_ids',
+                            help="Only rebuild the counters of this seller profile id (repeatable).")
+
+    def handle(self, *args, **options):
+        BuyerInteraction.objects.rebuild_counters(seller_ids=options['seller_ids'])
+        self.stdout.write(self.style.SUCCESS('Interaction counters rebuilt.'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    SolarSolution = apps.get_model('listings', 'SolarSolution')
+    BuyerInteraction = apps.get_model('listings', 'BuyerInteraction')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+
+    per_solution = (
+        BuyerInteraction.objects.filter(solar_solution=OuterRef('pk'))
+        .values('solar_solution')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    per_seller = (
+        BuyerInteraction.objects.filter(solar_solution__seller=OuterRef('pk'))
+        .values('solar_solution__seller')
+        .annotate(total=Count('whatsapp_number', distinct=True))
+        .values('total')
+    )
+    SolarSolution.objects.update(interaction_count=Coalesce(Subquery(per_solution), Value(0)))
+    UserProfile.objects.update(buyers_count=Coalesce(Subquery(per_seller), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userprofile_buyers_count'),
+        ('listings', '0011_alter_solarsolution_seller'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solarsolution',
+            name='interaction_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+TRIGRAM_INDEXES = [
+    ('listings_solution_search_trgm', 'listings_solarsolution', 'search_document'),
+]
+
+
+def backfill_search_document(apps, schema_editor):
+    SolarSolution = apps.get_model('listings', 'SolarSolution')
+    Company = apps.get_model('accounts', 'Company')
+
+    company_names = dict(Company.objects.values_list('owner_id', 'name'))
+    solutions = list(SolarSolution.objects.only('id', 'size', 'solution_type', 'seller_id'))
+    for solution in solutions:
+        company_name = company_names.get(solution.seller_id) or ''
+        solution.search_document = f'{solution.size}kw {solution.solution_type} {company_name}'.lower().strip()
+    SolarSolution.objects.bulk_update(solutions, ['search_document'], batch_size=500)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm only exists on PostgreSQL, other databases fall back to icontains (see listings.search)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userprofile_buyers_count'),
+        ('listings', '0012_solarsolution_interaction_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solarsolution',
+            name='search_document',
+            field=models.CharField(blank=True, default='', editable=False, max_length=400),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_company_accounts_company_city_upper'),
+        ('listings', '0013_solarsolution_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solarsolution',
+            index=models.Index(fields=['solution_type', 'size', 'price'], name='listings_solution_type_size'),
+        ),
+        migrations.AddIndex(
+            model_name='solarsolution',
+            index=models.Index(fields=['size', 'price'], name='listings_solution_size_price'),
+        ),
+        migrations.AddIndex(
+            model_name='solarsolution',
+            index=models.Index(fields=['price', 'id'], name='listings_solution_price'),
+        ),
+        migrations.AddIndex(
+            model_name='solarsolution',
+            index=models.Index(fields=['-created', '-id'], name='listings_solution_created'),
+        ),
+    ]
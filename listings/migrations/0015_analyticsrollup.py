@@ -0,0 +1,64 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:00
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    SolarSolution = apps.get_model('listings', 'SolarSolution')
+    BuyerInteraction = apps.get_model('listings', 'BuyerInteraction')
+    AnalyticsRollup = apps.get_model('listings', 'AnalyticsRollup')
+
+    def grouped(queryset, city_field):
+        return queryset.values(city=Coalesce(city_field, Value('')), day=TruncDate('created'))
+
+    rollups = defaultdict(dict)
+    for row in grouped(UserProfile.objects.filter(role='seller'), 'company__city').annotate(count=Count('id')):
+        rollups[row['city'], row['day']]['sellers'] = row['count']
+    for row in grouped(SolarSolution.objects.all(), 'seller__company__city').annotate(
+            count=Count('id'),
+            approved=Count('id', filter=Q(approval__admin_verified=True)),
+            unapproved=Count('id', filter=Q(approval__admin_verified=False))):
+        rollups[row['city'], row['day']].update(solutions=row['count'], approved_solutions=row['approved'],
+                                                unapproved_solutions=row['unapproved'])
+    for row in grouped(BuyerInteraction.objects.all(), 'solar_solution__seller__company__city').annotate(
+            count=Count('id')):
+        rollups[row['city'], row['day']]['buyer_interactions'] = row['count']
+
+    AnalyticsRollup.objects.bulk_create(
+        [AnalyticsRollup(city=city, day=day, **counters) for (city, day), counters in rollups.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_company_accounts_company_city_upper'),
+        ('listings', '0014_solarsolution_filter_indexes'),
+        ('operations', '0004_otpcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('day', models.DateField()),
+                ('sellers', models.PositiveIntegerField(default=0)),
+                ('solutions', models.PositiveIntegerField(default=0)),
+                ('approved_solutions', models.PositiveIntegerField(default=0)),
+                ('unapproved_solutions', models.PositiveIntegerField(default=0)),
+                ('buyer_interactions', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('city', 'day'), name='listings_rollup_city_day')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
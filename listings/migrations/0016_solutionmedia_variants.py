@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0015_analyticsrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solutionmedia',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
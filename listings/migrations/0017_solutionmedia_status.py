@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+def mark_processed_media_ready(apps, schema_editor):
+    SolutionMedia = apps.get_model('listings', 'SolutionMedia')
+    SolutionMedia.objects.exclude(variants={}).update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0016_solutionmedia_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solutionmedia',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.RunPython(mark_processed_media_ready, migrations.RunPython.noop),
+    ]
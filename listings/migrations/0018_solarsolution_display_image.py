@@ -0,0 +1,42 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def keep_one_display_image(apps, schema_editor):
+    # The newest flagged image of a solution stays its display image
+    SolutionMedia = apps.get_model('listings', 'SolutionMedia')
+    flagged = SolutionMedia.objects.filter(is_display_image=True)
+    newest = flagged.values('solution').annotate(newest=Max('id')).values('newest')
+    flagged.exclude(id__in=newest).update(is_display_image=False)
+
+
+def backfill_display_image(apps, schema_editor):
+    SolarSolution = apps.get_model('listings', 'SolarSolution')
+    SolutionMedia = apps.get_model('listings', 'SolutionMedia')
+    SolarSolution.objects.update(display_image=Subquery(
+        SolutionMedia.objects.filter(solution=OuterRef('pk'), is_display_image=True).values('id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0017_solutionmedia_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_one_display_image, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='solarsolution',
+            name='display_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='listings.solutionmedia'),
+        ),
+        migrations.RunPython(backfill_display_image, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='solutionmedia',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_display_image', True)), fields=('solution',), name='listings_one_display_image_per_solution'),
+        ),
+    ]
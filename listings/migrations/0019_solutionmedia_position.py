@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0018_solarsolution_display_image'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='solutionmedia',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddField(
+            model_name='solutionmedia',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,7 +1,12 @@
 from django.core.validators import MaxLengthValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Count, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
+from accounts.models import UserProfile
 from core.models import TimeStampedModel
+from . import cache
 
 
 class Tag(TimeStampedModel):
@@ -84,6 +89,17 @@ class PaymentSchedule(models.TextChoices):
     FLEXIBLE = 'Flexible', 'Flexible'
 
 
+def build_display_name(size, solution_type):
+    return f"{size} kW {solution_type} Solar Solution"
+
+
+def build_search_document(size, solution_type, company_name):
+    """
+    The text a listing is searched by: its display name parts and the seller's company name.
+    """
+    return f'{size}kw {solution_type} {company_name or ""}'.lower().strip()
+
+
 class SolarSolution(TimeStampedModel):
     size = models.PositiveIntegerField(help_text="Solution size in kW (e.g., 5.00 kW)")
     price = models.DecimalField(max_digits=10, decimal_places=2, help_text="Total price of the solution/package")
@@ -101,10 +117,43 @@ class SolarSolution(TimeStampedModel):
 
     components = models.ManyToManyField(SolutionComponent, blank=True, related_name='solar_solutions')
     seller_note = models.TextField(validators=[MaxLengthValidator(1000)], null=True, blank=True)  # Set max length to 500 characters
+    # Maintained by BuyerInteraction.objects.record(), rebuilt by `manage.py rebuild_interaction_counters`
+    interaction_count = models.PositiveIntegerField(default=0, editable=False)
+    # Size, type and company name, trigram indexed on PostgreSQL (see listings.search)
+    search_document = models.CharField(max_length=400, blank=True, default='', editable=False)
+    # The media flagged is_display_image, kept in sync by a signal so listings can join the cover image
+    display_image = models.ForeignKey('SolutionMedia', null=True, blank=True, on_delete=models.SET_NULL,
+                                      related_name='+', editable=False)
+
+    class Meta:
+        # One per access path of SolarSolutionFilter and the listing orderings,
+        # checked by `manage.py explain_listing_filters`
+        indexes = [
+            models.Index(fields=['solution_type', 'size', 'price'], name='listings_solution_type_size'),
+            models.Index(fields=['size', 'price'], name='listings_solution_size_price'),
+            models.Index(fields=['price', 'id'], name='listings_solution_price'),
+            models.Index(fields=['-created', '-id'], name='listings_solution_created'),
+        ]
 
     @property
     def display_name(self):
-        return f"{self.size} kW {self.solution_type} Solar Solution"
+        return build_display_name(self.size, self.solution_type)
+
+    def get_search_document(self):
+        company = getattr(self.seller, 'company', None) if self.seller_id else None
+        return build_search_document(self.size, self.solution_type, company.name if company else None)
+
+    # The fields search_document is built from
+    search_document_sources = {'size', 'solution_type', 'seller', 'seller_id'}
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # Partial saves of other fields skip the seller/company lookup
+        if update_fields is None or self.search_document_sources.intersection(update_fields):
+            self.search_document = self.get_search_document()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_document'}
+        super().save(*args, **kwargs)
 
 # will use through model for the ManyToMany later
 # components = models.ManyToManyField(SolutionComponent, through='SolarSolutionComponent', related_name='solar_solutions')
@@ -132,16 +181,140 @@ class Service(TimeStampedModel):
     transportation_distance = models.PositiveIntegerField(blank=True, null=True, help_text="Enter the distance if transportation is included.")
 
 
+class BuyerInteractionManager(models.Manager):
+    def record(self, solar_solution, whatsapp_number):
+        """
+        Create an interaction and bump the denormalized counters in the same transaction.
+        """
+        seller_id = solar_solution.seller_id
+        with transaction.atomic():
+            is_new_buyer = False
+            if seller_id:
+                # Lock the seller row so two confirmations from the same number can't both count as new
+                UserProfile.objects.select_for_update().filter(pk=seller_id).exists()
+                is_new_buyer = not self.filter(solar_solution__seller_id=seller_id,
+                                               whatsapp_number=whatsapp_number).exists()
+
+            interaction = self.create(solar_solution=solar_solution, whatsapp_number=whatsapp_number)
+
+            SolarSolution.objects.filter(pk=solar_solution.pk).update(interaction_count=F('interaction_count') + 1)
+            if is_new_buyer:
+                UserProfile.objects.filter(pk=seller_id).update(buyers_count=F('buyers_count') + 1)
+        return interaction
+
+    def rebuild_counters(self, seller_ids=None):
+        """
+        Recompute the counters from the interaction rows, optionally only for some sellers.
+        """
+        solutions = SolarSolution.objects.all()
+        sellers = UserProfile.objects.all()
+        if seller_ids is not None:
+            solutions = solutions.filter(seller_id__in=seller_ids)
+            sellers = sellers.filter(pk__in=seller_ids)
+
+        per_solution = (
+            self.filter(solar_solution=OuterRef('pk'))
+            .values('solar_solution')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        per_seller = (
+            self.filter(solar_solution__seller=OuterRef('pk'))
+            .values('solar_solution__seller')
+            .annotate(total=Count('whatsapp_number', distinct=True))
+            .values('total')
+        )
+
+        with transaction.atomic():
+            solutions.update(interaction_count=Coalesce(Subquery(per_solution), Value(0)))
+            sellers.update(buyers_count=Coalesce(Subquery(per_seller), Value(0)))
+
+
 class BuyerInteraction(TimeStampedModel):
     solar_solution = models.ForeignKey(SolarSolution, related_name='interactions', on_delete=models.CASCADE)
     whatsapp_number = models.CharField(max_length=15)
 
+    objects = BuyerInteractionManager()
+
+
+class SolutionMediaManager(models.Manager):
+    def set_display_image(self, solution_id, media_id):
+        """
+        Make one of the solution's images its display image and unflag the previous one.
+
+        At most one image per solution may be flagged, and PostgreSQL checks a partial unique
+        index row by row, so the old image is unflagged before the new one is flagged. The
+        solution row is locked so two swaps of the same solution can't interleave.
+        """
+        with transaction.atomic():
+            SolarSolution.objects.select_for_update().filter(pk=solution_id).exists()
+            self.filter(solution_id=solution_id, is_display_image=True).exclude(pk=media_id).update(
+                is_display_image=False)
+            if not self.filter(solution_id=solution_id, pk=media_id).update(is_display_image=True):
+                raise self.model.DoesNotExist
+            SolarSolution.objects.filter(pk=solution_id).update(display_image_id=media_id)
+            # Updates don't send the signals that normally invalidate the listing cache
+            transaction.on_commit(cache.invalidate)
+
+    def set_status(self, media, status, variants=None):
+        """
+        Record the outcome of processing `media`. Written with an update instead of save(), the
+        instance was read before the job ran and a save would send its `is_display_image` along.
+        """
+        values = {'status': status, 'updated': timezone.now()}
+        if variants is not None:
+            values['variants'] = variants
+        self.filter(pk=media.pk).update(**values)
+        for field, value in values.items():
+            setattr(media, field, value)
+        transaction.on_commit(cache.invalidate)
+
 
 class SolutionMedia(TimeStampedModel):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
     solution = models.ForeignKey(SolarSolution, related_name='mediafiles', on_delete=models.CASCADE)
     image = models.ImageField(upload_to=upload_to, blank=True, null=True, help_text="Upload an image of the solution")
     is_display_image = models.BooleanField(default=False,
                                            help_text="Indicates if this image is the display image for the solution")
+    # Resized copies of `image` with their URLs and dimensions, written by listings.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # The variants are rendered by a background job after the upload (see listings.tasks)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, editable=False)
+    # Gallery order, set by the seller through the batch media endpoint
+    position = models.PositiveIntegerField(default=0)
+
+    objects = SolutionMediaManager()
+
+    class Meta:
+        ordering = ['position', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['solution'], condition=models.Q(is_display_image=True),
+                                    name='listings_one_display_image_per_solution'),
+        ]
 
     def __str__(self):
         return f"Image for {self.solution} (Display: {self.is_display_image})"
+
+
+class AnalyticsRollup(models.Model):
+    """
+    Admin analytics counters per company city and day (the day the seller, solution or
+    interaction was created). Maintained by listings.analytics, '' is the city of sellers
+    without a company.
+    """
+    city = models.CharField(max_length=100, blank=True)
+    day = models.DateField()
+    sellers = models.PositiveIntegerField(default=0)
+    solutions = models.PositiveIntegerField(default=0)
+    approved_solutions = models.PositiveIntegerField(default=0)
+    unapproved_solutions = models.PositiveIntegerField(default=0)
+    buyer_interactions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['city', 'day'], name='listings_rollup_city_day'),
+        ]
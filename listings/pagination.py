@@ -0,0 +1,85 @@
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class SolarSolutionCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the marketplace listing.
+
+    Unlike the default PageNumberPagination this never runs a COUNT(*) and never
+    uses OFFSET to reach deep pages, so page 100 costs the same as page 1.
+
+    DRF positions a cursor on the first ordering field alone and counts an offset
+    among equal values, which degrades on a column like price. Here the position is
+    the (value, id) pair and the next page starts right after it, served by the
+    (created, id) and (price, id) indexes. Other orderings fall back to the default.
+    """
+    ordering = ('-created', '-id')
+    cursor_ordering_fields = ('created', 'price')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        field = ordering[0].lstrip('-')
+        if field not in self.cursor_ordering_fields:
+            return self.ordering
+
+        # id breaks ties in the same direction, (value, id) is unique
+        tiebreaker = '-id' if ordering[0].startswith('-') else 'id'
+        return (ordering[0], tiebreaker)
+
+    def _get_position_from_instance(self, instance, ordering):
+        value = super()._get_position_from_instance(instance, ordering)
+        pk = instance['id'] if isinstance(instance, dict) else instance.id
+        return f'{value}|{pk}'
+
+    def keyset_filter(self, position, after):
+        """Rows after (or before) the row at `position` in the (value, id) ordering."""
+        value, _, pk = position.rpartition('|')
+        if not value or not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        field = self.ordering[0].lstrip('-')
+        lookup = 'gt' if after else 'lt'
+        return Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': int(pk)})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset, with the keyset filter instead of one on the first field.
+        # Positions are unique, so the cursors never carry an offset.
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            # Test for: (cursor reversed) XOR (queryset reversed)
+            after = self.cursor.reverse == self.ordering[0].startswith('-')
+            queryset = queryset.filter(self.keyset_filter(current_position, after))
+
+        # One extra row tells whether a page follows
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (self._get_position_from_instance(results[-1], self.ordering)
+                              if has_following_position else None)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
@@ -0,0 +1,68 @@
+import re
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+
+from .models import SolutionType
+
+SIZE_PATTERN = re.compile(r'(\d+)\s*kw\b')
+
+# Spellings people use for each solution type
+SOLUTION_TYPE_PATTERNS = {
+    SolutionType.ON_GRID: ['on-grid', 'ongrid', 'on grid'],
+    SolutionType.OFF_GRID: ['off-grid', 'offgrid', 'off grid'],
+    SolutionType.HYBRID: ['hybrid'],
+}
+
+# Words that are in every display name and say nothing about the seller
+STOP_WORDS = {'kw', 'solar', 'solution', 'solutions', 'system', 'package'}
+
+
+def parse_query(value):
+    """
+    Split a free text query like "10kw hybrid axovolt" into a size, a solution type and
+    the remaining words, which are matched against the company name.
+    """
+    text = value.lower().replace('_', '-')
+    size = None
+    solution_type = None
+
+    size_match = SIZE_PATTERN.search(text)
+    if size_match:
+        size = int(size_match.group(1))
+        text = SIZE_PATTERN.sub(' ', text)
+
+    for candidate, patterns in SOLUTION_TYPE_PATTERNS.items():
+        pattern = next((pattern for pattern in patterns if pattern in text), None)
+        if pattern:
+            solution_type = candidate
+            text = text.replace(pattern, ' ')
+            break
+
+    terms = [word for word in re.findall(r'[\w&.-]+', text) if word not in STOP_WORDS]
+    return size, solution_type, terms
+
+
+def search_solutions(queryset, value):
+    size, solution_type, terms = parse_query(value)
+
+    if size is not None:
+        queryset = queryset.filter(size=size)
+    if solution_type is not None:
+        queryset = queryset.filter(solution_type=solution_type)
+    if not terms:
+        return queryset
+
+    # The queryset may read from the replica, which decides what it can run
+    if connections[queryset.db].vendor == 'postgresql':
+        # Answered by the pg_trgm GIN index on search_document, best matches first
+        text = ' '.join(terms)
+        return queryset.filter(
+            search_document__trigram_word_similar=text
+        ).annotate(
+            search_rank=TrigramWordSimilarity(text, 'search_document')
+        ).order_by('-search_rank', '-id')
+
+    for term in terms:
+        queryset = queryset.filter(search_document__icontains=term)
+    return queryset
@@ -0,0 +1,55 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from accounts.models import UserProfile, Company
+from operations.models import Approval
+from .models import SolarSolution, SolutionType, Service
+
+# The city filter offers the first three, the rest spread the sellers over more cities than it selects
+CITIES = ['Islamabad', 'Karachi', 'Lahore', 'Rawalpindi', 'Faisalabad', 'Multan', 'Peshawar', 'Quetta', 'Sialkot',
+          'Hyderabad']
+
+
+def seed_marketplace(solutions=1000, sellers=20, approved_ratio=0.8, seed=7):
+    """
+    Create `sellers` seller profiles (with companies) and `solutions` solar solutions spread
+    across them. Used by the benchmark and EXPLAIN commands, always inside a rolled back transaction.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+
+    profiles = []
+    for index in range(sellers):
+        user = User.objects.create(email=f'seed-seller-{index}@example.com', full_name=f'Seed Seller {index}')
+        profile = UserProfile.objects.create(user=user, role=UserProfile.Role.SELLER)
+        Company.objects.create(owner=profile, name=f'Seed Solar Company {index}', phone_number='0000000000',
+                               description='Seeded company', city=CITIES[index % len(CITIES)])
+        profiles.append(profile)
+
+    solution_types = [choice for choice, _ in SolutionType.choices]
+    SolarSolution.objects.bulk_create(
+        [
+            SolarSolution(
+                size=rng.randint(1, 200),
+                price=Decimal(rng.randint(200_000, 6_000_000)),
+                solution_type=rng.choice(solution_types),
+                seller=profiles[index % sellers],
+            )
+            for index in range(solutions)
+        ],
+        batch_size=1000,
+    )
+
+    created = SolarSolution.objects.filter(seller__in=profiles)
+    Service.objects.bulk_create([Service(solution_id=pk) for pk in created.values_list('id', flat=True)],
+                                batch_size=1000)
+    Approval.objects.bulk_create(
+        [
+            Approval(solution_id=pk, admin_verified=rng.random() < approved_ratio)
+            for pk in created.values_list('id', flat=True)
+        ],
+        batch_size=1000,
+    )
+    return profiles
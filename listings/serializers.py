@@ -1,11 +1,31 @@
+from collections import defaultdict
+
 from django.core.validators import MaxLengthValidator
+from drf_yasg.utils import swagger_serializer_method
 from rest_framework import serializers
+from rest_framework.fields import SkipField
 
-from accounts.models import UserProfile, Company
 from accounts.serializers import CompanySerializer
 from operations.models import Approval
 from operations.serializers import ApprovalSerializer
-from .models import SolarSolution, Tag, SolutionMedia, SolutionComponent, Service, BuyerInteraction
+from .images import open_image, InvalidImage
+from .models import SolarSolution, Tag, SolutionMedia, SolutionComponent, Service, BuyerInteraction, build_display_name
+
+
+def values_representation(serializer, values):
+    """
+    What `serializer` returns for an instance, built from a dict of the instance's column values.
+    Only for serializers of plain model fields.
+    """
+    return {
+        field.field_name: None if values[field.source] is None else field.to_representation(values[field.source])
+        for field in serializer._readable_fields
+    }
+
+
+def prefixed(row, prefix):
+    """The `prefix__column` values of a values() row, keyed by column."""
+    return {key[len(prefix):]: value for key, value in row.items() if key.startswith(prefix)}
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -17,10 +37,61 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class SolutionMediaSerializer(serializers.ModelSerializer):
+    """
+    Uploads keep the original, reads return the `variant` rendition of it (see listings.images)
+    as `image` and `image_webp`, falling back to the original while `status` is pending.
+    """
     image = serializers.ImageField()
+    variant = 'full'
 
     class Meta:
         model = SolutionMedia
+        fields = ['id', 'image', 'is_display_image', 'position', 'status', 'variants']
+        read_only_fields = ['position']
+
+    def validate_image(self, value):
+        try:
+            open_image(value)
+        except InvalidImage as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+    def absolute_url(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def to_representation(self, instance):
+        return self.add_variant_urls(super().to_representation(instance), instance.variants)
+
+    def values_representation(self, values):
+        """to_representation() for a dict of the media's column values (see represent_rows below)."""
+        image = SolutionMedia._meta.get_field('image')
+        if values['variants'].get(self.variant):
+            file = None  # replaced by the variant's URL, building the original's (a Cloudinary URL) is wasted
+        else:
+            file = image.attr_class(None, image, values['image'])  # the ImageField renders a file, not the name
+        data = values_representation(self, {**values, 'image': file})
+        return self.add_variant_urls(data, values['variants'])
+
+    def add_variant_urls(self, data, variants):
+        variant = variants.get(self.variant)
+        if variant:
+            data['image'] = self.absolute_url(variant['jpeg'])
+        data['image_webp'] = self.absolute_url(variant['webp']) if variant else None
+        if 'variants' in data:
+            data['variants'] = {
+                name: {**rendition, 'webp': self.absolute_url(rendition['webp']),
+                       'jpeg': self.absolute_url(rendition['jpeg'])}
+                for name, rendition in variants.items()
+            }
+        return data
+
+
+class SolutionMediaCardSerializer(SolutionMediaSerializer):
+    """The listing card size, without the other variants."""
+    variant = 'card'
+
+    class Meta(SolutionMediaSerializer.Meta):
         fields = ['id', 'image', 'is_display_image']
 
 
@@ -29,6 +100,24 @@ class UpdateMediaSerializer(serializers.Serializer):
     is_display_image = serializers.BooleanField(required=False)
 
 
+class MediaBatchItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    position = serializers.IntegerField(min_value=0, required=False)
+    is_display_image = serializers.BooleanField(required=False)
+
+
+class MediaBatchSerializer(serializers.Serializer):
+    images = MediaBatchItemSerializer(many=True, allow_empty=False, max_length=100)
+
+    def validate_images(self, value):
+        ids = [item['id'] for item in value]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each image can only be listed once.")
+        if sum(item.get('is_display_image') is True for item in value) > 1:
+            raise serializers.ValidationError("Only one image can be the display image.")
+        return value
+
+
 class SolutionComponentSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
 
@@ -124,26 +213,94 @@ class BuyerInteractionSerializer(serializers.ModelSerializer):
         fields = ['whatsapp_number']
 
 
-class SolarSolutionListSerializer(serializers.ModelSerializer):
-    # buyer_interaction_count, buyer_whatsapp_count, these fields will be be included on the Seller Page
-    # we'll make enhancement for this in Future.
-    # or we create another Seperate Api for seller page
-    buyer_interaction_count = serializers.SerializerMethodField()
-    buyer_whatsapp_numbers = BuyerInteractionSerializer(many=True, source='interactions')
-    images = SolutionMediaSerializer(many=True, source='mediafiles')  # Use the related name for images
+class PublicSolarSolutionListSerializer(serializers.ModelSerializer):
+    """
+    Listing fields everyone may see. Anonymous users and buyers get only these, so their
+    queryset never has to load approvals or interaction rows.
+    """
+    images = serializers.SerializerMethodField()
     seller_note = serializers.CharField(validators=[MaxLengthValidator(500)], required=False, allow_blank=True)
     company = CompanySerializer(source='seller.company', read_only=True)
-    approval_status = serializers.SerializerMethodField()
 
     class Meta:
         model = SolarSolution
+        fields = ['id', 'size', 'price', 'solution_type', 'completion_time_days', 'payment_schedule',
+                  'images', 'seller_note', 'display_name', 'company']
+
+    # The list view reads plain rows of these columns instead of model instances, see represent_rows().
+    # `created` is the cursor pagination position.
+    row_columns = ['id', 'created', 'size', 'price', 'solution_type', 'completion_time_days', 'payment_schedule',
+                   'seller_note', 'seller_id',
+                   *[f'seller__company__{name}' for name in CompanySerializer.Meta.fields],
+                   *[f'display_image__{name}' for name in ('id', 'image', 'is_display_image', 'variants')]]
+
+    @swagger_serializer_method(serializer_or_field=SolutionMediaCardSerializer(many=True))
+    def get_images(self, obj):
+        # Only the cover image, select_related('display_image') joins it into the page query
+        if obj.display_image is None:
+            return []
+        return [SolutionMediaCardSerializer(obj.display_image, context=self.context).data]
+
+    @classmethod
+    def row_values(cls, queryset):
+        return queryset.values(*cls.row_columns)
+
+    def represent_rows(self, rows):
+        """
+        The same JSON as serializing the solutions with `many=True`, built from row_values() dicts
+        without creating model instances or walking the nested serializers field by field.
+        """
+        rows = list(rows)
+        self.prepare_rows(rows)
+        self._company_serializer = CompanySerializer(context=self.context)
+        self._image_serializer = SolutionMediaCardSerializer(context=self.context)
+        fields = list(self._readable_fields)
+
+        data = []
+        for row in rows:
+            item = {}
+            for field in fields:
+                try:
+                    item[field.field_name] = self.row_field(field, row)
+                except SkipField:
+                    pass
+            data.append(item)
+        return data
+
+    def prepare_rows(self, rows):
+        """Load what the page needs beyond its own columns, once for all rows."""
+
+    def row_field(self, field, row):
+        name = field.field_name
+        if name == 'images':
+            if row['display_image__id'] is None:
+                return []
+            return [self._image_serializer.values_representation(prefixed(row, 'display_image__'))]
+        if name == 'company':
+            if row['seller_id'] is None:
+                raise SkipField  # like `seller.company` on a solution without seller
+            if row['seller__company__id'] is None:
+                return None
+            return values_representation(self._company_serializer, prefixed(row, 'seller__company__'))
+        if name == 'display_name':
+            return build_display_name(row['size'], row['solution_type'])
+        value = row[field.source]
+        return None if value is None else field.to_representation(value)
+
+
+class SolarSolutionListSerializer(PublicSolarSolutionListSerializer):
+    # buyer_interaction_count, buyer_whatsapp_count, these fields are only for admins and sellers
+    buyer_interaction_count = serializers.IntegerField(source='interaction_count', read_only=True)
+    buyer_whatsapp_numbers = BuyerInteractionSerializer(many=True, source='interactions')
+    approval_status = serializers.SerializerMethodField()
+
+    class Meta(PublicSolarSolutionListSerializer.Meta):
         fields = ['id', 'size', 'price', 'solution_type', 'completion_time_days', 'payment_schedule',
                   'buyer_interaction_count', 'buyer_whatsapp_numbers', 'images', 'seller_note',
                   'display_name', 'company', 'approval_status']
 
-    def get_buyer_interaction_count(self, obj):
-        # Count the number of interactions related to this SolarSolution
-        return obj.interactions.count()
+    row_columns = PublicSolarSolutionListSerializer.row_columns + ['interaction_count', 'approval__id',
+                                                                   'approval__admin_verified']
 
     def get_approval_status(self, obj):
         approval = getattr(obj, 'approval', None)
@@ -154,28 +311,24 @@ class SolarSolutionListSerializer(serializers.ModelSerializer):
             }
         return None
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        request = self.context.get('request')
-
-        # Check if request and user exist
-        if request and hasattr(request, 'user'):
-            user = request.user
-
-            # Handle anonymous users
-            if user.is_anonymous or not hasattr(user, 'userprofile'):
-                representation.pop('approval_status', None)
-                representation.pop('buyer_interaction_count', None)
-                representation.pop('buyer_whatsapp_numbers', None)
-
-            else:
-                # If the user is not an admin or a seller, remove sensitive fields
-                if user.userprofile.role not in [UserProfile.Role.ADMIN, UserProfile.Role.SELLER]:
-                    representation.pop('approval_status', None)
-                    representation.pop('buyer_interaction_count', None)
-                    representation.pop('buyer_whatsapp_numbers', None)
-
-        return representation
+    def prepare_rows(self, rows):
+        # One query for the page, in the order the `interactions` prefetch returns them
+        interactions = defaultdict(list)
+        number_serializer = BuyerInteractionSerializer(context=self.context)
+        for values in (BuyerInteraction.objects.filter(solar_solution_id__in=[row['id'] for row in rows])
+                       .order_by('id').values('solar_solution_id', 'whatsapp_number')):
+            interactions[values['solar_solution_id']].append(values_representation(number_serializer, values))
+        for row in rows:
+            row['interactions'] = interactions[row['id']]
+
+    def row_field(self, field, row):
+        if field.field_name == 'buyer_whatsapp_numbers':
+            return row['interactions']
+        if field.field_name == 'approval_status':
+            if row['approval__id'] is None:
+                return None
+            return {'id': row['approval__id'], 'approved': row['approval__admin_verified']}
+        return super().row_field(field, row)
 
 
 class BuyerPerPackageSerializer(serializers.Serializer):
@@ -191,6 +344,25 @@ class SellerReportSerializer(serializers.Serializer):
     products = SolarSolutionListSerializer(many=True)
 
 
+class PackageSummarySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    size = serializers.IntegerField()
+    solution_type = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    buyers = serializers.IntegerField(source='interaction_count')
+    approved = serializers.BooleanField(allow_null=True, help_text="null while the package has no approval")
+
+
+class SellerSummarySerializer(serializers.Serializer):
+    seller_id = serializers.IntegerField()
+    seller_name = serializers.CharField()
+    total_packages = serializers.IntegerField()
+    total_buyers = serializers.IntegerField()
+    approved_packages = serializers.IntegerField()
+    unapproved_packages = serializers.IntegerField()
+    packages = PackageSummarySerializer(many=True)
+
+
 class SellerCityCountSerializer(serializers.Serializer):
     city = serializers.CharField(source='company__city')
     count = serializers.IntegerField(source='city_sellers', required=False)
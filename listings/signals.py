@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import Company, UserProfile
+from operations.models import Approval
+from . import analytics, cache
+from .images import delete_variants
+from .models import SolarSolution, Service, SolutionMedia, BuyerInteraction, build_search_document
+
+
+@receiver([post_save, post_delete], sender=SolarSolution)
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=SolutionMedia)
+@receiver([post_save, post_delete], sender=Approval)
+@receiver([post_save, post_delete], sender=Company)  # company name and city are part of every listing row
+def invalidate_listing_cache(sender, **kwargs):
+    cache.invalidate()
+    # A request running while the transaction was open may have cached the old rows again
+    transaction.on_commit(cache.invalidate)
+
+
+@receiver(post_save, sender=Company)
+def refresh_search_documents(sender, instance, **kwargs):
+    solutions = list(SolarSolution.objects.filter(seller_id=instance.owner_id).only('id', 'size', 'solution_type'))
+    for solution in solutions:
+        solution.search_document = build_search_document(solution.size, solution.solution_type, instance.name)
+    SolarSolution.objects.bulk_update(solutions, ['search_document'], batch_size=500)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=SolarSolution)
+def refresh_analytics_day(sender, instance, **kwargs):
+    analytics.schedule_refresh(instance.created)
+
+
+@receiver([post_save, post_delete], sender=Approval)
+def refresh_analytics_for_approval(sender, instance, **kwargs):
+    analytics.schedule_refresh(
+        SolarSolution.objects.filter(id=instance.solution_id).values_list('created', flat=True).first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Company)
+def refresh_analytics_for_company(sender, instance, **kwargs):
+    # The city moves the seller, their solutions and their interactions between rollup rows
+    owner = instance.owner_id
+    analytics.schedule_refresh(
+        UserProfile.objects.filter(id=owner).values_list('created', flat=True).first(),
+        *SolarSolution.objects.filter(seller_id=owner).datetimes('created', 'day'),
+        *BuyerInteraction.objects.filter(solar_solution__seller_id=owner).datetimes('created', 'day'),
+    )
+
+
+@receiver(post_save, sender=BuyerInteraction)
+def count_buyer_interaction(sender, instance, created, **kwargs):
+    if created:
+        analytics.record_interaction(instance)
+    else:
+        analytics.schedule_refresh(instance.created)
+
+
+@receiver(post_delete, sender=BuyerInteraction)
+def uncount_buyer_interaction(sender, instance, **kwargs):
+    analytics.schedule_refresh(instance.created)
+
+
+@receiver(post_save, sender=SolutionMedia)
+def sync_display_image(sender, instance, created, update_fields, **kwargs):
+    # Partial saves of other fields may come from an instance read before the display image moved
+    if not created and update_fields is not None and 'is_display_image' not in update_fields:
+        return
+    solutions = SolarSolution.objects.filter(id=instance.solution_id)
+    if instance.is_display_image:
+        solutions.exclude(display_image=instance).update(display_image=instance)
+    else:
+        solutions.filter(display_image=instance).update(display_image=None)
+
+
+@receiver(post_delete, sender=SolutionMedia)
+def delete_media_variants(sender, instance, **kwargs):
+    if instance.variants:
+        media_id = instance.id  # delete() clears the pk before the transaction commits
+        transaction.on_commit(lambda: delete_variants(media_id))
@@ -0,0 +1,24 @@
+"""
+Background tasks of the listings app, run through core.jobs.
+"""
+import logging
+
+from .images import InvalidImage, process_media
+from .models import SolutionMedia
+
+logger = logging.getLogger(__name__)
+
+
+def process_solution_media(media_id):
+    """
+    Render the variants of an uploaded image. Images that can't be decoded are marked failed
+    right away, other errors (e.g. the storage being unreachable) are raised and retried.
+    """
+    media = SolutionMedia.objects.filter(id=media_id).first()
+    if media is None:  # deleted before the job ran
+        return
+    try:
+        process_media(media)
+    except InvalidImage:
+        logger.warning('SolutionMedia %s is not a valid image', media_id)
+        SolutionMedia.objects.set_status(media, SolutionMedia.Status.FAILED)
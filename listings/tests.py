@@ -1,13 +1,40 @@
+import shutil
+import tempfile
+import time
+from datetime import timedelta
 from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.management import call_command, CommandError
+from django.db import connection, IntegrityError
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PILImage
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
 from rest_framework.test import APITestCase
 
-from accounts.models import UserProfile
+from accounts.models import UserProfile, Company
 from accounts.tests import BaseTestCase
-from .models import SolarSolution, Tag, SolutionComponent, Service, ComponentType, SolutionType
+from core.jobs import claim_jobs, run_job
+from core.models import Job
+from operations.models import Approval
+from .management.commands.explain_listing_filters import check_plans
+from .models import SolarSolution, Tag, SolutionComponent, Service, ComponentType, SolutionType, BuyerInteraction, \
+    SolutionMedia, AnalyticsRollup
+from . import analytics
+from .pagination import SolarSolutionCursorPagination
+from .search import parse_query, search_solutions
+from .serializers import PublicSolarSolutionListSerializer, SolarSolutionListSerializer
 
 
 class SolarSolutionViewSetTestCase(BaseTestCase):
@@ -23,7 +50,7 @@ class SolarSolutionViewSetTestCase(BaseTestCase):
             size=5.00,
             price=10000,
             solution_type=SolutionType.HYBRID,
-            seller=self.user
+            seller=self.user_profile
         )
 
         # Create SolutionComponent instances
@@ -151,4 +178,726 @@ class TagListCreateTestCase(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
         tag = Tag.objects.get(id=response.data['id'])
-        self.assertEqual(tag.name, self.valid_tag_data['name'])
\ No newline at end of file
+        self.assertEqual(tag.name, self.valid_tag_data['name'])
+
+class SolarSolutionCursorPaginationTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('solar-solution-list')
+        for index in range(5):
+            SolarSolution.objects.create(size=5, price=1000 * (index % 3 + 1), solution_type=SolutionType.HYBRID,
+                                         seller=self.user_profile)
+
+    def collect(self, params):
+        ids, next_link = [], None
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            next_link = response.data['next']
+            if not next_link:
+                return ids
+            response = self.client.get(next_link)
+
+    @mock.patch.object(SolarSolutionCursorPagination, 'page_size', 2)
+    def test_cursor_mode_walks_every_row_once_in_price_order(self):
+        ids = self.collect({'pagination': 'cursor', 'ordering': 'price'})
+
+        expected = list(SolarSolution.objects.order_by('price', 'id').values_list('id', flat=True))
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(ids, expected)
+
+    @mock.patch.object(SolarSolutionCursorPagination, 'page_size', 2)
+    def test_cursor_mode_pages_by_value_and_id_in_both_directions(self):
+        for _ in range(4):
+            SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                         seller=self.user_profile)
+        expected = list(SolarSolution.objects.order_by('-price', '-id').values_list('id', flat=True))
+
+        pages, response = [], self.client.get(self.url, {'pagination': 'cursor', 'ordering': '-price'})
+        while True:
+            pages.append([item['id'] for item in response.data['results']])
+            if not response.data['next']:
+                break
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(response.data['next'])
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual([pk for page in pages for pk in page], expected)
+
+        for page in reversed(pages[:-1]):
+            response = self.client.get(response.data['previous'])
+            self.assertEqual([item['id'] for item in response.data['results']], page)
+        self.assertIsNone(response.data['previous'])
+
+    def test_cursor_mode_skips_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'pagination': 'cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_page_number_mode_is_still_the_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 5)
+
+
+class BuyerInteractionCounterTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.solution = SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                                     seller=self.user_profile)
+        self.other_solution = SolarSolution.objects.create(size=10, price=2000, solution_type=SolutionType.ON_GRID,
+                                                           seller=self.user_profile)
+
+    def test_record_counts_interactions_and_distinct_buyers(self):
+        BuyerInteraction.objects.record(self.solution, '+920000000001')
+        BuyerInteraction.objects.record(self.solution, '+920000000001')
+        BuyerInteraction.objects.record(self.other_solution, '+920000000001')
+        BuyerInteraction.objects.record(self.other_solution, '+920000000002')
+
+        self.solution.refresh_from_db()
+        self.other_solution.refresh_from_db()
+        self.user_profile.refresh_from_db()
+        self.assertEqual(self.solution.interaction_count, 2)
+        self.assertEqual(self.other_solution.interaction_count, 2)
+        self.assertEqual(self.user_profile.buyers_count, 2)
+
+    def test_rebuild_command_repairs_drifted_counters(self):
+        BuyerInteraction.objects.create(solar_solution=self.solution, whatsapp_number='+920000000001')
+        BuyerInteraction.objects.create(solar_solution=self.other_solution, whatsapp_number='+920000000001')
+
+        call_command('rebuild_interaction_counters', stdout=StringIO())
+
+        self.solution.refresh_from_db()
+        self.user_profile.refresh_from_db()
+        self.assertEqual(self.solution.interaction_count, 1)
+        self.assertEqual(self.user_profile.buyers_count, 1)
+
+    def test_deleting_a_solution_refreshes_seller_buyers_count(self):
+        BuyerInteraction.objects.record(self.solution, '+920000000001')
+        BuyerInteraction.objects.record(self.other_solution, '+920000000002')
+
+        response = self.client.delete(reverse('solar-solution-detail', args=[self.solution.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.user_profile.refresh_from_db()
+        self.assertEqual(self.user_profile.buyers_count, 1)
+
+
+class SolarSolutionListRoleTestCase(BaseTestCase):
+    # Generous wall-clock budget for one page, catches N+1 regressions without being flaky
+    RESPONSE_TIME_BUDGET = 1.0
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('solar-solution-list')
+        for index in range(20):
+            solution = SolarSolution.objects.create(size=5 + index, price=1000, solution_type=SolutionType.HYBRID,
+                                                    seller=self.user_profile)
+            Approval.objects.create(solution=solution, admin_verified=index % 2 == 0)
+            SolutionMedia.objects.create(solution=solution, is_display_image=True)
+            BuyerInteraction.objects.record(solution, f'+92000000{index:04d}')
+
+    def list_as(self, role, expected_queries):
+        if role is None:
+            self.client.credentials()
+        else:
+            self.authenticate_user(email=f'{role}@example.com', role=role)
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = self.client.get(self.url)
+            elapsed = time.perf_counter() - start
+
+        # Leave out the rows silk writes while profiling the request
+        sql = [query['sql'] for query in queries.captured_queries
+               if 'silk_' not in query['sql'] and not query['sql'].startswith(('EXPLAIN', 'SAVEPOINT', 'RELEASE'))]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(len(sql), expected_queries, sql)
+        self.assertLess(elapsed, self.RESPONSE_TIME_BUDGET)
+        return response, ' '.join(sql)
+
+    def assert_public_listing(self, response, sql):
+        self.assertTrue(all(len(item['images']) == 1 for item in response.data['results']))
+        self.assertNotIn('listings_buyerinteraction', sql)
+        self.assertNotIn('operations_approval', sql)
+        for item in response.data['results']:
+            self.assertNotIn('buyer_whatsapp_numbers', item)
+            self.assertNotIn('buyer_interaction_count', item)
+            self.assertNotIn('approval_status', item)
+
+    def assert_private_listing(self, response):
+        item = response.data['results'][0]
+        self.assertEqual(len(item['buyer_whatsapp_numbers']), 1)
+        self.assertEqual(item['buyer_interaction_count'], 1)
+        self.assertIn('approved', item['approval_status'])
+
+    def test_anonymous_listing(self):
+        # count, page with the display images joined
+        response, sql = self.list_as(None, expected_queries=2)
+        self.assert_public_listing(response, sql)
+
+    def test_buyer_listing(self):
+        # The role comes from the token claims, no user or profile query
+        response, sql = self.list_as(UserProfile.Role.BUYER, expected_queries=2)
+        self.assert_public_listing(response, sql)
+
+    def test_seller_listing(self):
+        # + interactions prefetch, approvals are joined into the page query
+        response, _ = self.list_as(UserProfile.Role.SELLER, expected_queries=3)
+        self.assert_private_listing(response)
+
+    def test_admin_listing(self):
+        response, _ = self.list_as(UserProfile.Role.ADMIN, expected_queries=3)
+        self.assert_private_listing(response)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'list-rows-tests'},
+})
+class ListRowsContractTestCase(BaseTestCase):
+    """The list view renders values() rows, the output must match serializing the instances."""
+
+    def setUp(self):
+        super().setUp()
+        caches['shared'].clear()
+        Company.objects.create(owner=self.user_profile, name='Sunny Side', phone_number='0300', description='Solar',
+                               city='Lahore')
+        User = get_user_model()
+        no_company = UserProfile.objects.create(user=User.objects.create_user(email='bare@example.com', password='x'),
+                                                role=UserProfile.Role.SELLER)
+        variants = {name: {'width': width, 'height': width, 'webp': f'/media/v/{name}.webp',
+                           'jpeg': f'/media/v/{name}.jpeg'}
+                    for name, width in (('thumbnail', 320), ('card', 800), ('full', 1920))}
+
+        for index, seller in enumerate([self.user_profile, self.user_profile, no_company, None, self.user_profile]):
+            solution = SolarSolution.objects.create(size=5 + index, price=Decimal('1234.50') * (index + 1),
+                                                    solution_type=SolutionType.choices[index % 3][0], seller=seller,
+                                                    seller_note='Fast install' if index % 2 else None)
+            if index < 3:
+                Approval.objects.create(solution=solution, admin_verified=index == 0)
+            if index == 0:
+                SolutionMedia.objects.create(solution=solution, image='solutions/ready.jpg', is_display_image=True,
+                                             variants=variants, status=SolutionMedia.Status.READY)
+            elif index == 1:
+                SolutionMedia.objects.create(solution=solution, image='solutions/pending.jpg', is_display_image=True)
+            elif index == 2:
+                SolutionMedia.objects.create(solution=solution, is_display_image=True)
+            for number in range(index % 3):
+                BuyerInteraction.objects.record(solution, f'+9230000000{number}')
+
+    def assert_matches_serializer(self, role, serializer_class):
+        if role is None:
+            self.client.credentials()
+        else:
+            self.authenticate_user(email=f'{role}@example.com', role=role)
+
+        response = self.client.get(reverse('solar-solution-list'), {'ordering': 'id'})
+
+        queryset = SolarSolution.objects.select_related('seller__company', 'display_image', 'approval') \
+            .prefetch_related('interactions').order_by('id')
+        expected = serializer_class(queryset, many=True, context={'request': response.wsgi_request}).data
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(JSONRenderer().render(response.data['results']), JSONRenderer().render(expected))
+
+    def test_anonymous(self):
+        self.assert_matches_serializer(None, PublicSolarSolutionListSerializer)
+
+    def test_buyer(self):
+        self.assert_matches_serializer(UserProfile.Role.BUYER, PublicSolarSolutionListSerializer)
+
+    def test_seller(self):
+        self.assert_matches_serializer(UserProfile.Role.SELLER, SolarSolutionListSerializer)
+
+    def test_admin(self):
+        self.assert_matches_serializer(UserProfile.Role.ADMIN, SolarSolutionListSerializer)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'listing-cache-tests'},
+})
+class AnonymousListingCacheTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        caches['shared'].clear()
+        self.client.credentials()
+        self.url = reverse('solar-solution-list')
+        self.solution = SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                                     seller=self.user_profile)
+        Company.objects.create(owner=self.user_profile, name='Cache Solar', phone_number='0', description='-',
+                               city='Islamabad')
+
+    def app_queries(self, queries):
+        return [query for query in queries.captured_queries
+                if 'silk_' not in query['sql'] and not query['sql'].startswith(('EXPLAIN', 'SAVEPOINT', 'RELEASE'))]
+
+    def test_repeat_browse_is_served_from_cache(self):
+        first = self.client.get(self.url, {'city': 'ISB', 'size': 5})
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url + '?utm_source=ad&size=5&city=ISB&price=')
+
+        self.assertEqual(self.app_queries(queries), [])
+        self.assertEqual(len(first.data['results']), 1)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('Last-Modified', second)
+
+    def test_saving_a_listing_invalidates_the_cache(self):
+        first = self.client.get(self.url)
+
+        self.solution.price = 2000
+        self.solution.save()
+        second = self.client.get(self.url)
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(second.data['results'][0]['price'], '2000.00')
+
+    def test_matching_etag_returns_not_modified(self):
+        first = self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+
+        response = self.client.get(self.url)
+
+        self.assertNotIn('ETag', response)
+
+
+class SolarSolutionSearchTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('solar-solution-list')
+        self.hybrid = SolarSolution.objects.create(size=10, price=1000, solution_type=SolutionType.HYBRID,
+                                                   seller=self.user_profile)
+        self.on_grid = SolarSolution.objects.create(size=10, price=1000, solution_type=SolutionType.ON_GRID,
+                                                    seller=self.user_profile)
+        Company.objects.create(owner=self.user_profile, name='Axovolt', phone_number='0', description='-',
+                               city='Lahore')
+
+        User = get_user_model()
+        other_user = User.objects.create_user(email='other@example.com', password='password')
+        other_profile = UserProfile.objects.create(user=other_user, role=UserProfile.Role.SELLER)
+        Company.objects.create(owner=other_profile, name='Sun Players & Co', phone_number='0', description='-',
+                               city='Lahore')
+        self.other = SolarSolution.objects.create(size=10, price=1000, solution_type=SolutionType.HYBRID,
+                                                  seller=other_profile)
+
+    def search(self, text):
+        response = self.client.get(self.url, {'display_name': text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['id'] for item in response.data['results'])
+
+    def test_parse_query(self):
+        self.assertEqual(parse_query('10kw Hybrid Axovolt'), (10, SolutionType.HYBRID, ['axovolt']))
+        self.assertEqual(parse_query('5 KW off grid solar'), (5, SolutionType.OFF_GRID, []))
+        self.assertEqual(parse_query('on_grid'), (None, SolutionType.ON_GRID, []))
+
+    def test_search_follows_the_database_of_the_queryset(self):
+        databases = {'default': mock.Mock(vendor='sqlite'), 'replica': mock.Mock(vendor='postgresql')}
+        with mock.patch('listings.search.connections', databases):
+            on_default = search_solutions(SolarSolution.objects.using('default'), 'axovolt')
+            on_replica = search_solutions(SolarSolution.objects.using('replica'), 'axovolt')
+
+        self.assertNotIn('search_rank', on_default.query.annotations)
+        self.assertIn('search_rank', on_replica.query.annotations)
+
+    def test_search_combines_size_type_and_company(self):
+        self.assertEqual(self.search('10kw hybrid axovolt'), [self.hybrid.id])
+        self.assertEqual(self.search('10kw hybrid'), sorted([self.hybrid.id, self.other.id]))
+        self.assertEqual(self.search('sun players'), [self.other.id])
+
+    def test_company_rename_refreshes_search_document(self):
+        company = self.user_profile.company
+        company.name = 'Inverex Power'
+        company.save()
+
+        self.assertEqual(self.search('inverex'), sorted([self.hybrid.id, self.on_grid.id]))
+        self.assertEqual(self.search('axovolt'), [])
+
+    def test_partial_saves_only_rebuild_the_document_from_its_fields(self):
+        solution = SolarSolution.objects.get(pk=self.hybrid.pk)
+        solution.price = 1500
+        with CaptureQueriesContext(connection) as queries:
+            solution.save(update_fields=['price'])
+        self.assertEqual(len(queries), 1)
+
+        solution.solution_type = SolutionType.ON_GRID
+        solution.save(update_fields=['solution_type'])
+        solution.refresh_from_db()
+        self.assertEqual(solution.search_document, '10kw on-grid axovolt')
+
+
+class ExplainListingFiltersTestCase(APITestCase):
+    def test_filters_are_served_by_the_new_indexes(self):
+        out = StringIO()
+        call_command('explain_listing_filters', solutions=300, sellers=6, verbose_plans=True, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('listings_solution_size_price', output)
+        self.assertIn('listings_solution_type_size', output)
+        self.assertIn('operations_approval_verified', output)
+        self.assertFalse(SolarSolution.objects.exists())
+
+    def test_sequential_scans_of_the_solutions_fail(self):
+        plans = {
+            ('size',): 'Index Scan using listings_solution_size_price on listings_solarsolution',
+            ('city',): 'Seq Scan on listings_solarsolution\n  Bitmap Index Scan on accounts_company_city_upper',
+            ('approved',): 'Seq Scan on listings_solarsolution\n  Seq Scan on operations_approval',
+            ('price', 'approved'): 'Index Scan using listings_solution_price on listings_solarsolution',
+            ('display_name', 'approved'): 'Seq Scan on listings_solarsolution\n'
+                                          '  Index Scan using operations_approval_verified on operations_approval',
+        }
+
+        self.assertEqual(check_plans(plans), ([('city',), ('display_name', 'approved')], ['display_name']))
+
+
+class AnalyticsRollupTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(owner=self.user_profile, name='Axovolt', phone_number='0', description='-',
+                                   city='Lahore')
+            other_user = User.objects.create_user(email='karachi@example.com', password='password')
+            other_seller = UserProfile.objects.create(user=other_user, role=UserProfile.Role.SELLER)
+            Company.objects.create(owner=other_seller, name='Sun Players', phone_number='0', description='-',
+                                   city='Karachi')
+
+            approved, unapproved = [SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                                                 seller=self.user_profile) for _ in range(2)]
+            Approval.objects.create(solution=approved, admin_verified=True)
+            Approval.objects.create(solution=unapproved)
+            other = SolarSolution.objects.create(size=8, price=2000, solution_type=SolutionType.ON_GRID,
+                                                 seller=other_seller)
+
+            BuyerInteraction.objects.record(approved, '+920000000001')
+            BuyerInteraction.objects.record(approved, '+920000000002')
+            BuyerInteraction.objects.record(other, '+920000000001')
+
+        self.authenticate_user(email='admin@example.com', role='admin')
+
+    def analytics(self, **params):
+        response = self.client.get(reverse('analytics-admin-analytics'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_admin_analytics_reads_the_rollups(self):
+        data = self.analytics()
+
+        self.assertEqual(data['sellers']['total'], 2)
+        self.assertEqual(data['solar_solutions'], {'total': 3, 'approved': 1, 'unapproved': 1})
+        self.assertEqual(data['buyers']['total'], 3)
+        self.assertEqual({row['city']: row['count'] for row in data['buyers']['buyer_by_city_count']},
+                         {'Lahore': 2, 'Karachi': 1})
+
+        lahore = self.analytics(city='Lahore')
+        self.assertEqual(lahore['sellers']['seller_by_city_count'], [{'city': 'Lahore', 'count': 1}])
+        self.assertEqual(lahore['solar_solutions']['total'], 2)
+        self.assertEqual(lahore['buyers']['total'], 2)
+
+    def test_city_change_moves_the_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            company = Company.objects.get(city='Karachi')
+            company.city = 'Lahore'
+            company.save()
+
+        self.assertEqual(self.analytics(city='Lahore')['buyers']['total'], 3)
+        self.assertEqual(self.analytics(city='Karachi')['sellers']['total'], 0)
+
+    def test_refresh_updates_the_rows_in_place(self):
+        today = timezone.localdate()
+        rows = dict(AnalyticsRollup.objects.values_list('city', 'id'))
+        AnalyticsRollup.objects.update(buyer_interactions=0)
+        AnalyticsRollup.objects.create(city='Quetta', day=today, sellers=1)
+
+        analytics.refresh_days([today])
+
+        self.assertEqual(dict(AnalyticsRollup.objects.values_list('city', 'id')), rows)
+        self.assertEqual(self.analytics()['buyers']['total'], 3)
+
+    def test_refresh_creates_every_row_before_counting(self):
+        day = timezone.localdate() + timedelta(days=1)
+        rows_while_counting = []
+        compute_rollups = analytics.compute_rollups
+
+        def compute(days):
+            rows_while_counting.extend(AnalyticsRollup.objects.filter(day=day).values_list('city', flat=True))
+            return compute_rollups(days)
+
+        with mock.patch.object(analytics, 'compute_rollups', compute):
+            analytics.refresh_days([day])
+
+        self.assertEqual(set(rows_while_counting), {'', 'Lahore', 'Karachi'})
+        self.assertFalse(AnalyticsRollup.objects.filter(day=day).exists())
+
+    def test_check_and_rebuild_commands(self):
+        call_command('check_analytics_rollups', stdout=StringIO())
+
+        AnalyticsRollup.objects.update(buyer_interactions=0)
+        with self.assertRaises(CommandError):
+            call_command('check_analytics_rollups', stdout=StringIO())
+
+        call_command('rebuild_analytics_rollups', stdout=StringIO())
+        call_command('check_analytics_rollups', stdout=StringIO())
+
+
+class SellerAnalyticsSummaryTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.approved, self.unapproved, self.pending = [
+            SolarSolution.objects.create(size=size, price=1000, solution_type=SolutionType.HYBRID,
+                                         seller=self.user_profile)
+            for size in (5, 8, 10)
+        ]
+        Approval.objects.create(solution=self.approved, admin_verified=True)
+        Approval.objects.create(solution=self.unapproved)
+        BuyerInteraction.objects.record(self.approved, '+920000000001')
+        BuyerInteraction.objects.record(self.approved, '+920000000002')
+        BuyerInteraction.objects.record(self.pending, '+920000000001')
+
+    def test_summary_comes_from_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('analytics-seller-analytics'), {'mode': 'summary'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_packages'], 3)
+        self.assertEqual(response.data['total_buyers'], 3)
+        self.assertEqual((response.data['approved_packages'], response.data['unapproved_packages']), (1, 1))
+        self.assertEqual([(package['id'], package['buyers'], package['approved'])
+                          for package in response.data['packages']],
+                         [(self.approved.id, 2, True), (self.unapproved.id, 0, False), (self.pending.id, 1, None)])
+        solution_queries = [query for query in queries.captured_queries
+                            if 'silk_' not in query['sql'] and 'listings_' in query['sql']]
+        self.assertEqual(len(solution_queries), 1)
+
+    def test_products_are_paginated(self):
+        with mock.patch.object(api_settings.DEFAULT_PAGINATION_CLASS, 'page_size', 2):
+            response = self.client.get(reverse('analytics-seller-products'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.pending.id, self.unapproved.id])
+        self.assertEqual(response.data['results'][0]['buyer_interaction_count'], 1)
+
+
+def make_photo(width=3000, height=2000, orientation=6):
+    """A JPEG like a phone's: sideways pixels, an EXIF orientation and some identifying EXIF."""
+    exif = PILImage.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = 'PhoneMaker'
+    buffer = BytesIO()
+    PILImage.new('RGB', (width, height), 'orange').save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class MediaStorageMixin:
+    """Store media in a temporary directory instead of Cloudinary and process it right away."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage_settings = override_settings(JOBS_RUN_INLINE=True, MEDIA_ROOT=media_root, STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+
+class SolutionMediaVariantsTestCase(MediaStorageMixin, BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.solution = SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                                     seller=self.user_profile)
+
+    def upload(self, image):
+        return self.client.post(reverse('solar-solution-upload-media', args=[self.solution.id]),
+                                {'image': image, 'is_display_image': True}, format='multipart')
+
+    def test_upload_renders_upright_stripped_variants(self):
+        response = self.upload(make_photo())
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        media = SolutionMedia.objects.get(solution=self.solution)
+        self.assertEqual({name: (variant['width'], variant['height']) for name, variant in media.variants.items()},
+                         {'thumbnail': (213, 320), 'card': (533, 800), 'full': (1280, 1920)})
+
+        for variant in media.variants.values():
+            for extension in ('webp', 'jpeg'):
+                name = variant[extension].removeprefix(settings.MEDIA_URL)
+                with default_storage.open(name) as file:
+                    image = PILImage.open(file)
+                    self.assertEqual(image.format, extension.upper())
+                    self.assertEqual(len(image.getexif()), 0)
+
+    def test_serializers_return_the_variant_for_the_page(self):
+        self.upload(make_photo())
+        media = SolutionMedia.objects.get()
+
+        self.client.credentials()
+        listing = self.client.get(reverse('solar-solution-list'))
+        detail = self.client.get(reverse('solar-solution-detail', args=[self.solution.id]))
+
+        [card] = listing.data['results'][0]['images']
+        self.assertTrue(card['image'].endswith(media.variants['card']['jpeg']))
+        self.assertTrue(card['image_webp'].endswith(media.variants['card']['webp']))
+        self.assertNotIn('variants', card)
+        [full] = detail.data['images']
+        self.assertTrue(full['image'].endswith(media.variants['full']['jpeg']))
+        self.assertEqual(set(full['variants']), {'thumbnail', 'card', 'full'})
+
+    def test_upload_moves_the_display_image(self):
+        first = self.upload(make_photo()).data['media']['id']
+        second = self.upload(make_photo()).data['media']['id']
+
+        self.assertEqual(list(SolutionMedia.objects.values_list('id', 'is_display_image', 'position')),
+                         [(first, False, 0), (second, True, 1)])
+        self.solution.refresh_from_db()
+        self.assertEqual(self.solution.display_image_id, second)
+
+    def test_variants_are_deleted_with_the_media(self):
+        self.upload(make_photo())
+        media = SolutionMedia.objects.get()
+        name = media.variants['card']['webp'].removeprefix(settings.MEDIA_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            media.delete()
+
+        self.assertFalse(default_storage.exists(name))
+
+    @override_settings(JOBS_RUN_INLINE=False)
+    def test_upload_returns_before_processing(self):
+        response = self.upload(make_photo())
+
+        self.assertEqual(response.data['media']['status'], SolutionMedia.Status.PENDING)
+        self.assertEqual(response.data['media']['variants'], {})
+        [job] = claim_jobs()
+        self.assertEqual(job.kwargs, {'media_id': response.data['media']['id']})
+
+        self.assertTrue(run_job(job))
+        media = SolutionMedia.objects.get()
+        self.assertEqual(media.status, SolutionMedia.Status.READY)
+        self.assertEqual(set(media.variants), {'thumbnail', 'card', 'full'})
+
+    def test_undecodable_images_are_marked_failed(self):
+        photo = make_photo().read()
+        truncated = SimpleUploadedFile('photo.jpg', photo[:len(photo) // 2], content_type='image/jpeg')
+
+        with self.assertLogs('listings.tasks', 'WARNING'):
+            response = self.upload(truncated)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['media']['status'], SolutionMedia.Status.FAILED)
+        self.assertFalse(Job.objects.filter(status=Job.Status.PENDING).exists())
+
+    def test_files_that_are_not_images_are_rejected(self):
+        response = self.upload(SimpleUploadedFile('photo.jpg', b'not an image', content_type='image/jpeg'))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SolutionMedia.objects.exists())
+
+
+class DisplayImageTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.solution = SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                                     seller=self.user_profile)
+        self.first = SolutionMedia.objects.create(solution=self.solution, is_display_image=True)
+        self.second = SolutionMedia.objects.create(solution=self.solution)
+        self.url = reverse('solar-solution-update-media', args=[self.solution.id])
+
+    def display_image_id(self):
+        self.solution.refresh_from_db()
+        return self.solution.display_image_id
+
+    def test_update_media_moves_the_display_image(self):
+        self.assertEqual(self.display_image_id(), self.first.id)
+
+        response = self.client.patch(self.url, {'image_id': self.second.id, 'is_display_image': True},
+                                     format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.display_image_id(), self.second.id)
+        self.assertEqual(list(SolutionMedia.objects.filter(is_display_image=True)), [self.second])
+
+    def test_deleting_the_display_image_clears_it(self):
+        response = self.client.delete(self.url, {'image_id': self.first.id}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(self.display_image_id())
+
+    def test_display_image_check_is_scoped_to_the_solution(self):
+        other = SolarSolution.objects.create(size=8, price=2000, solution_type=SolutionType.HYBRID,
+                                             seller=self.user_profile)
+        SolutionMedia.objects.create(solution=other, is_display_image=True)
+
+        response = self.client.patch(self.url, {'image_id': self.second.id, 'is_display_image': False},
+                                     format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.patch(self.url, {'image_id': self.first.id, 'is_display_image': False},
+                                     format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.display_image_id(), self.first.id)
+
+    def test_stale_instances_do_not_move_the_display_image_back(self):
+        stale_first = SolutionMedia.objects.get(id=self.first.id)
+        stale_second = SolutionMedia.objects.get(id=self.second.id)
+        SolutionMedia.objects.set_display_image(self.solution.id, self.second.id)
+
+        stale_first.position = 3
+        stale_first.save(update_fields=['position', 'updated'])
+        SolutionMedia.objects.set_status(stale_second, SolutionMedia.Status.READY, variants={})
+
+        self.assertEqual(self.display_image_id(), self.second.id)
+        self.assertEqual(list(SolutionMedia.objects.filter(is_display_image=True)), [self.second])
+        self.assertEqual(SolutionMedia.objects.get(id=self.second.id).status, SolutionMedia.Status.READY)
+
+    def test_batch_reorders_and_moves_the_display_image(self):
+        url = reverse('solar-solution-batch-media', args=[self.solution.id])
+        images = [
+            {'id': self.second.id, 'position': 0, 'is_display_image': True},
+            {'id': self.first.id, 'position': 1, 'is_display_image': False},
+        ]
+
+        response = self.client.patch(url, {'images': images}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual([(item['id'], item['is_display_image']) for item in response.data],
+                         [(self.second.id, True), (self.first.id, False)])
+        self.assertEqual(self.display_image_id(), self.second.id)
+
+    def test_batch_is_validated_before_anything_changes(self):
+        url = reverse('solar-solution-batch-media', args=[self.solution.id])
+        other = SolarSolution.objects.create(size=8, price=2000, solution_type=SolutionType.HYBRID,
+                                             seller=self.user_profile)
+        foreign = SolutionMedia.objects.create(solution=other)
+
+        for images in (
+            [{'id': self.second.id, 'position': 5}, {'id': foreign.id, 'position': 0}],
+            [{'id': self.first.id, 'is_display_image': True}, {'id': self.second.id, 'is_display_image': True}],
+            [{'id': self.first.id, 'is_display_image': False}, {'id': self.second.id, 'position': 5}],
+        ):
+            with self.subTest(images=images):
+                response = self.client.patch(url, {'images': images}, format='json')
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(self.display_image_id(), self.first.id)
+                self.second.refresh_from_db()
+                self.assertEqual(self.second.position, 0)
+
+    def test_at_most_one_display_image_per_solution(self):
+        with self.assertRaises(IntegrityError):
+            SolutionMedia.objects.filter(id=self.second.id).update(is_display_image=True)
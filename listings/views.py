@@ -1,5 +1,3 @@
-import re
-
 import django_filters
 from django_filters import filters
 from django_filters.rest_framework import DjangoFilterBackend
@@ -13,26 +11,45 @@ from rest_framework.generics import ListCreateAPIView
 from rest_framework.parsers import FormParser, MultiPartParser, JSONParser
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
 
 from accounts.models import UserProfile
-from accounts.permissions import IsAdmin, IsSeller, IsAdminOrSeller
+from accounts.permissions import IsAdmin, IsSeller, IsAdminOrSeller, get_user_role
+from core.db_router import ReplicaReadMixin
+from core.jobs import enqueue
 from operations.models import Approval
-from .models import SolarSolution, Tag, SolutionMedia, SolutionComponent, Service, BuyerInteraction
+from .models import SolarSolution, Tag, SolutionMedia, SolutionComponent, Service, BuyerInteraction, AnalyticsRollup
+from . import analytics, cache as listing_cache
+from .pagination import SolarSolutionCursorPagination
+from .search import search_solutions
+from .tasks import process_solution_media
 from .serializers import SolarSolutionListSerializer, SolarSolutionCreateSerializer, SolutionMediaSerializer, \
     SellerReportSerializer, SolarSolutionDetailSerializer, TagSerializer, SolarSolutionUpdateSerializer, \
-    SolutionComponentSerializer, AdminAnalyticsSerializer, UpdateMediaSerializer
-from django.db.models import Prefetch, Q, Count, F
+    SolutionComponentSerializer, AdminAnalyticsSerializer, UpdateMediaSerializer, PublicSolarSolutionListSerializer, \
+    SellerSummarySerializer, MediaBatchSerializer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q, Count, F, Max, Sum
+from django.utils import timezone
 
 
-class SolarSolutionViewSet(viewsets.ModelViewSet):
+class SolarSolutionViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = SolarSolutionListSerializer  # default fallback
     # ordering fields
     # search fields
 
+    def can_view_interactions(self):
+        """
+        Only admins and sellers see approval state and which buyers interacted with a listing.
+        """
+        return get_user_role(self.request.user) in [UserProfile.Role.ADMIN, UserProfile.Role.SELLER]
+
     def get_serializer_class(self):
         if self.action == 'list':
-            return SolarSolutionListSerializer
+            if self.can_view_interactions():
+                return SolarSolutionListSerializer
+            return PublicSolarSolutionListSerializer
         elif self.action == 'create':
             return SolarSolutionCreateSerializer
         elif self.action == 'retrieve':
@@ -53,6 +70,16 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAdminOrSeller()]
 
+    def reads_from_replica(self, request):
+        """
+        Anonymous browsing. Right after the listings changed the primary is read instead, a lagging
+        replica would otherwise put the old page in the listing cache.
+        """
+        if self.action not in ('list', 'retrieve') or request.user.is_authenticated:
+            return False
+        changed = timezone.now() - listing_cache.get_state()['last_modified']
+        return changed.total_seconds() > settings.REPLICA_MAX_LAG
+
     class SolarSolutionFilter(django_filters.FilterSet):
         CITY_CHOICES = (
             ('ISB', 'Islamabad'),
@@ -107,9 +134,8 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
             return queryset
 
         def filter_by_is_seller_page(self, queryset, name, value):
-            if (value and self.request.user.is_authenticated and
-                    self.request.user.userprofile.role == UserProfile.Role.SELLER):
-                return queryset.filter(seller=self.request.user.userprofile)
+            if value and get_user_role(self.request.user) == UserProfile.Role.SELLER:
+                return queryset.filter(seller_id=self.request.user.userprofile_id)
             return queryset
 
         def filter_by_approved(self, queryset, name, value):
@@ -120,62 +146,47 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
         def filter_by_display_name(self, queryset, name, value):
             if not value:
                 return queryset
-
-            value = value.lower().replace('_', '-').replace(' ', '')
-
-            filters = {}
-            q_objects = Q()
-
-            # Extract size
-            size_match = re.search(r'(\d+)\s*kw', value)
-            if size_match:
-                filters['size'] = size_match.group(1)
-
-            # Match solution types with variations
-            solution_patterns = {
-                'on-grid': ['ongrid', 'on-grid', 'ongridsolar'],
-                'off-grid': ['offgrid', 'off-grid', 'offgridsolar'],
-                'hybrid': ['hybrid', 'hybridsolar']
-            }
-
-            for solution_type, patterns in solution_patterns.items():
-                if any(pattern in value for pattern in patterns):
-                    filters['solution_type__icontains'] = solution_type
-                    break
-
-            # Using Q objects to combine filters with OR condition for seller's company name
-            q_objects |= Q(seller__company__name__icontains=value)
-            if filters:
-                base_query = queryset.filter(**filters)
-            else:
-                base_query = queryset
-
-            return base_query.filter(q_objects).distinct()
+            # e.g. "10kw hybrid axovolt": size and type become column filters, the rest is
+            # matched against the indexed search_document (no company join, no DISTINCT)
+            return search_solutions(queryset, value)
 
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = SolarSolutionFilter
+    ordering_fields = ['id', 'created', 'size', 'price', 'solution_type', 'completion_time_days',
+                       'payment_schedule', 'seller_note']
 
+    @property
+    def paginator(self):
+        """
+        Opt-in keyset pagination: `?pagination=cursor` (or following a `cursor` link)
+        switches the list from page numbers to SolarSolutionCursorPagination.
+        """
+        if not hasattr(self, '_paginator'):
+            query_params = self.request.query_params
+            if query_params.get('pagination') == 'cursor' or 'cursor' in query_params:
+                self._paginator = SolarSolutionCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
 
     def get_queryset(self):
-        solar_solution_qs = SolarSolution.objects.select_related(
+        display_images = Prefetch('mediafiles', queryset=SolutionMedia.objects.filter(is_display_image=True))
+
+        if self.action == 'list':
+            # Plain rows with just the columns the caller's role sees, anonymous and buyer traffic
+            # never joins approvals or loads interaction rows (see represent_rows())
+            return self.get_serializer_class().row_values(SolarSolution.objects.all())
+
+        return SolarSolution.objects.select_related(
             'seller', 'service',
             'seller__user',
-            'seller__company'
+            'seller__company',
+            'approval'
         ).prefetch_related(
-            'interactions',
-            Prefetch('mediafiles', queryset=SolutionMedia.objects.filter(is_display_image=True)),
-        )
-
-        if self.action == 'list':
-            return solar_solution_qs
-        else:
-            return solar_solution_qs.select_related(
-                'service',
-                'approval'
-            ).prefetch_related(
-                'tags',
-                'components'
-            ).order_by('id')
+            display_images,
+            'tags',
+            'components'
+        ).order_by('id')
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -194,6 +205,13 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
         solar_solution = serializer.save(seller=user_profile)
         Approval.objects.create(solution=solar_solution)
 
+    def perform_destroy(self, instance):
+        seller_id = instance.seller_id
+        instance.delete()
+        # The deleted interactions may have been the seller's only contact with some buyers
+        if seller_id:
+            BuyerInteraction.objects.rebuild_counters(seller_ids=[seller_id])
+
     def perform_update(self, serializer):
         instance = serializer.save()  # Save the instance first
 
@@ -249,17 +267,23 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def list(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            # Anonymous browse looks the same for everyone, serve it from the shared cache
+            allowed_params = set(self.filterset_class.base_filters) | set(listing_cache.PAGINATION_PARAMS)
+            return listing_cache.cached_list_response(request, allowed_params, lambda: self.list_response(request))
+        return self.list_response(request)
+
+    def list_response(self, request):
         queryset = self.filter_queryset(self.get_queryset())  # Use the filter here
 
         page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer()
 
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(serializer.represent_rows(page))
 
         # If no pagination is applied, return all objects
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(serializer.represent_rows(queryset))
 
     @swagger_auto_schema(
         operation_description="Upload a media file for a SolarSolution.",
@@ -272,21 +296,32 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
         Upload a single media file for a SolarSolution.
         """
         solar_solution = self.get_object()  # Get the specific SolarSolution instance
-        if not solar_solution.seller == request.user.userprofile:
+        if not solar_solution.seller_id == request.user.userprofile_id:
             raise ValidationError("You are not allowed to upload media for this solution.")
 
         # Use the serializer to validate the data
-        serializer = SolutionMediaSerializer(data=request.data)
+        serializer = SolutionMediaSerializer(data=request.data, context=self.get_serializer_context())
         if serializer.is_valid():
-            # Check if the current image is marked as display image
-            if serializer.validated_data.get('is_display_image'):
-                # Set all other images as not display image
-                SolutionMedia.objects.filter(solution=solar_solution, is_display_image=True).update(
-                    is_display_image=False)
-
-            # Create a SolutionMedia instance
-            serializer.save(solution=solar_solution)  # Save with the related solution
-            return Response({'status': 'media file uploaded'}, status=status.HTTP_201_CREATED)
+            is_display_image = serializer.validated_data.get('is_display_image', False)
+            with transaction.atomic():
+                # Locked so concurrent uploads get their own positions and move the display image in turn
+                SolarSolution.objects.select_for_update().filter(pk=solar_solution.pk).exists()
+
+                # Create a SolutionMedia instance, last in the gallery. It's created unflagged:
+                # at most one display image per solution is enforced by a constraint, and
+                # set_display_image unflags the previous one first
+                last_position = SolutionMedia.objects.filter(solution=solar_solution).aggregate(
+                    last=Max('position'))['last']
+                media = serializer.save(solution=solar_solution, is_display_image=False,
+                                        position=0 if last_position is None else last_position + 1)
+                if is_display_image:
+                    SolutionMedia.objects.set_display_image(solar_solution.id, media.id)
+                    media.is_display_image = True
+            # Resizing takes seconds of CPU for a large photo, a job worker does it and fills in the variants
+            enqueue(process_solution_media, media_id=media.id)
+            media.refresh_from_db(fields=['status', 'variants'])  # already processed with JOBS_RUN_INLINE
+            media_data = SolutionMediaSerializer(media, context=serializer.context).data
+            return Response({'status': 'media file uploaded', 'media': media_data}, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -300,8 +335,8 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
     def update_media(self, request, pk=None):
         solar_solution = self.get_object()  # Get the specific SolarSolution instance
 
-        if not (solar_solution.seller == request.user.userprofile or
-                request.user.userprofile.role == UserProfile.Role.ADMIN):
+        if not (solar_solution.seller_id == request.user.userprofile_id or
+                get_user_role(request.user) == UserProfile.Role.ADMIN):
             raise ValidationError("You are not allowed to update media for this solution.")
 
         serializer = UpdateMediaSerializer(data=request.data)
@@ -316,18 +351,10 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
 
             if request.method == 'PUT' or request.method == 'PATCH':
                 if is_display_image:
-                    SolutionMedia.objects.filter(solution=solar_solution, is_display_image=True).exclude(
-                        id=image_id).update(
-                        is_display_image=False)
-                    media.is_display_image = True
-                else:
-                    display_image_exists = SolutionMedia.objects.filter(is_display_image=True).exclude(id=image_id).exists()
-                    if display_image_exists:
-                        media.is_display_image = False
+                    SolutionMedia.objects.set_display_image(solar_solution.id, media.id)
+                elif media.is_display_image:
                     raise ValidationError(
                         "You can't modify this image. You need to set another image as display image first.")
-
-                media.save()  # Save the updated media
                 return Response({'status': 'media file updated'}, status=status.HTTP_200_OK)
 
             elif request.method == 'DELETE':
@@ -335,6 +362,49 @@ class SolarSolutionViewSet(viewsets.ModelViewSet):
                 return Response({'status': 'media file deleted'}, status=status.HTTP_204_NO_CONTENT)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @swagger_auto_schema(method='patch', request_body=MediaBatchSerializer,
+                         responses={200: SolutionMediaSerializer(many=True), 400: "Invalid input"})
+    @action(detail=True, methods=['patch'], url_path='media/batch')
+    def batch_media(self, request, pk=None):
+        """
+        Reorder images and move the display image in one request, e.g.
+        `{"images": [{"id": 3, "position": 0, "is_display_image": true}, {"id": 1, "position": 1}]}`.
+        """
+        solar_solution = self.get_object()
+        if not (solar_solution.seller_id == request.user.userprofile_id or
+                get_user_role(request.user) == UserProfile.Role.ADMIN):
+            raise ValidationError("You are not allowed to update media for this solution.")
+
+        serializer = MediaBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['images']
+
+        # Not solar_solution.mediafiles, get_queryset() prefetches only the display image into it
+        solution_media = SolutionMedia.objects.filter(solution=solar_solution)
+        media = solution_media.in_bulk([item['id'] for item in items])
+        missing = [item['id'] for item in items if item['id'] not in media]
+        if missing:
+            raise ValidationError({'images': [f"Media not found: {', '.join(map(str, missing))}"]})
+
+        display_id = next((item['id'] for item in items if item.get('is_display_image')), None)
+        if display_id is None and any(item.get('is_display_image') is False and media[item['id']].is_display_image
+                                      for item in items):
+            raise ValidationError("You can't modify this image. You need to set another image as display image first.")
+
+        repositioned = []
+        for item in items:
+            if 'position' in item and item['position'] != media[item['id']].position:
+                media[item['id']].position = item['position']
+                repositioned.append(media[item['id']])
+
+        with transaction.atomic():
+            SolutionMedia.objects.bulk_update(repositioned, ['position'])
+            if display_id is not None:
+                SolutionMedia.objects.set_display_image(solar_solution.id, display_id)
+
+        serializer = SolutionMediaSerializer(solution_media, many=True, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
 class AnalyticsViewSet(viewsets.ViewSet):
 
@@ -354,34 +424,33 @@ class AnalyticsViewSet(viewsets.ViewSet):
     def admin_analytics(self, request):
         city = request.query_params.get('city')
 
-        seller_filter = Q(role='seller')
-        solution_filter = Q()
-        buyer_filter = Q()
+        # Pre-aggregated per city and day (see listings.analytics), summed per city in one query
+        rollups = AnalyticsRollup.objects.all()
         if city:
-            seller_filter &= Q(company__city__exact=city)
-            solution_filter &= Q(seller__company__city__exact=city)
-            buyer_filter &= Q(solar_solution__seller__company__city__exact=city)
-
-        # Seller counts
-        total_sellers = UserProfile.objects.filter(seller_filter).count()
-        sellers_by_city = (
-            UserProfile.objects.filter(seller_filter)
-            .values('company__city')
-            .annotate(city_sellers=Count('id'))
+            rollups = rollups.filter(city=city)
+        per_city = list(
+            rollups.values('city')
+            .annotate(*(Sum(counter) for counter in analytics.COUNTERS))
+            .order_by('city')
         )
 
+        def total(counter):
+            return sum(row[f'{counter}__sum'] for row in per_city)
+
+        # Seller counts, '' is the rollup city of sellers without a company
+        total_sellers = total('sellers')
+        sellers_by_city = [{'company__city': row['city'] or None, 'city_sellers': row['sellers__sum']}
+                           for row in per_city if row['sellers__sum']]
+
         # Solar Solution counts
-        total_solutions = SolarSolution.objects.filter(solution_filter).count()
-        approved_solutions = SolarSolution.objects.filter(solution_filter, approval__admin_verified=True).count()
-        unapproved_solutions = SolarSolution.objects.filter(solution_filter, approval__admin_verified=False).count()
+        total_solutions = total('solutions')
+        approved_solutions = total('approved_solutions')
+        unapproved_solutions = total('unapproved_solutions')
 
         # Buyer counts
-        total_buyers = BuyerInteraction.objects.filter(buyer_filter).count()
-        buyers_by_city = (
-            BuyerInteraction.objects.filter(buyer_filter)
-            .values(company__city=F('solar_solution__seller__company__city'))
-            .annotate(city_buyers=Count('id'))
-        )
+        total_buyers = total('buyer_interactions')
+        buyers_by_city = [{'company__city': row['city'] or None, 'city_buyers': row['buyer_interactions__sum']}
+                          for row in per_city if row['buyer_interactions__sum']]
 
         # Prepare response data
         response_data = {
@@ -406,18 +475,25 @@ class AnalyticsViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[IsSeller])
     @swagger_auto_schema(
-        operation_description="Seller Analytics",
+        operation_description="Seller Analytics. `mode=summary` returns lead counts and approval states per package "
+                              "instead of the full products, which are paginated by `seller_products`.",
+        manual_parameters=[
+            openapi.Parameter("mode", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['summary'])
+        ],
         responses={200: SellerReportSerializer()}
     )
     def seller_analytics(self, request, pk=None):
         seller = request.user
-        seller_profile = seller.userprofile
+        seller_profile_id = seller.userprofile_id
+
+        if request.query_params.get('mode') == 'summary':
+            return self.seller_summary(seller, seller_profile_id)
 
         # Fetch solar solutions for the seller
         solar_solutions = (
-            SolarSolution.objects.select_related('seller', 'seller__user', 'seller__company')
-            .prefetch_related('interactions', 'mediafiles', 'components')
-            .filter(seller=seller_profile)
+            SolarSolution.objects.select_related('seller', 'seller__user', 'seller__company', 'display_image')
+            .prefetch_related('interactions', 'components')
+            .filter(seller_id=seller_profile_id)
         )
 
         # Calculate total buyers
@@ -446,6 +522,44 @@ class AnalyticsViewSet(viewsets.ViewSet):
         serializer = SellerReportSerializer(seller_data)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def seller_summary(self, seller, seller_profile_id):
+        # One query: the lead count is the denormalized interaction_count, the approval a LEFT JOIN
+        packages = list(
+            SolarSolution.objects.filter(seller_id=seller_profile_id)
+            .values('id', 'size', 'solution_type', 'price', 'interaction_count',
+                    approved=F('approval__admin_verified'))
+            .order_by('id')
+        )
+        summary = {
+            'seller_id': seller.id,
+            'seller_name': seller.full_name,
+            'total_packages': len(packages),
+            'total_buyers': sum(package['interaction_count'] for package in packages),
+            'approved_packages': sum(package['approved'] is True for package in packages),
+            'unapproved_packages': sum(package['approved'] is False for package in packages),
+            'packages': packages,
+        }
+        return Response(SellerSummarySerializer(summary).data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsSeller])
+    @swagger_auto_schema(
+        operation_description="The seller's own packages with their buyers, paginated",
+        responses={200: SolarSolutionListSerializer(many=True)}
+    )
+    def seller_products(self, request):
+        queryset = SolarSolution.objects.filter(
+            seller_id=request.user.userprofile_id
+        ).select_related(
+            'seller__company', 'approval', 'display_image'
+        ).prefetch_related(
+            'interactions'
+        ).order_by('-created', '-id')
+
+        paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = SolarSolutionListSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
 
 class ComponentViewSet(viewsets.ModelViewSet):
     queryset = SolutionComponent.objects.all()
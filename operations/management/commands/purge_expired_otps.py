@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from operations.otp import get_otp_store
+
+
+class Command(BaseCommand):
+    help = "Delete expired one-time codes from the OTP store. Meant to run from cron every few minutes."
+
+    def handle(self, *args, **options):
+        deleted = get_otp_store().purge_expired()
+        self.stdout.write(f'Deleted {deleted} expired codes.')
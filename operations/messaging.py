@@ -0,0 +1,191 @@
+"""
+Outbound WhatsApp messages, behind a gateway that keeps a slow or failing provider from
+tying up the web workers.
+
+- The Twilio client is built on first use with a bounded timeout and a pooled HTTP session,
+  so connections are reused across messages.
+- A circuit breaker opens after `MESSAGING_FAILURE_THRESHOLD` consecutive provider failures and
+  rejects calls straight away for `MESSAGING_RESET_TIMEOUT` seconds, then lets one trial call through.
+- Latency and error counts are kept per process and served by the messaging metrics endpoint.
+
+The transport is chosen with `MESSAGING_TRANSPORT`, tests use `FakeTransport`.
+"""
+import functools
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class MessagingError(Exception):
+    pass
+
+
+class CircuitOpenError(MessagingError):
+    pass
+
+
+class TwilioTransport:
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from twilio.http.http_client import TwilioHttpClient
+            from twilio.rest import Client
+
+            http_client = TwilioHttpClient(pool_connections=True, timeout=settings.TWILIO_TIMEOUT)
+            self._client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client)
+        return self._client
+
+    def send_whatsapp(self, to, body, **kwargs):
+        return self.client.messages.create(
+            body=body,
+            from_=settings.TWILIO_WHATSAPP_NUMBER,
+            to=f'whatsapp:{to}',
+            **kwargs
+        )
+
+    @staticmethod
+    def is_outage(exc):
+        """Rejected requests (bad number, bad template...) say nothing about the provider's health."""
+        from twilio.base.exceptions import TwilioRestException
+
+        return not isinstance(exc, TwilioRestException) or exc.status >= 500
+
+
+class FakeTransport:
+    """Records messages instead of sending them. Set `error` to make every send raise it."""
+
+    def __init__(self):
+        self.sent = []
+        self.error = None
+
+    def send_whatsapp(self, to, body, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.sent.append({'to': to, 'body': body, **kwargs})
+
+    @staticmethod
+    def is_outage(exc):
+        return True
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        with self.lock:
+            state = self.state
+            if state == self.OPEN:
+                raise CircuitOpenError('Messaging provider is unavailable, not trying again yet.')
+            if state == self.HALF_OPEN:
+                # Let this call through as the trial, everyone else waits for its outcome
+                self.opened_at = self.clock()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+class Metrics:
+    def __init__(self, window=200):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, elapsed_ms, error=False):
+        with self.lock:
+            self.calls += 1
+            self.errors += error
+            self.latencies.append(elapsed_ms)
+
+    def record_rejected(self):
+        with self.lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+            def percentile(fraction):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 1)
+
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95),
+                               'max': round(latencies[-1], 1) if latencies else None},
+            }
+
+
+class MessagingGateway:
+    def __init__(self, transport, breaker, metrics=None):
+        self.transport = transport
+        self.breaker = breaker
+        self.metrics = metrics or Metrics()
+
+    def send_whatsapp(self, to, body, **kwargs):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.metrics.record_rejected()
+            raise
+
+        start = time.perf_counter()
+        try:
+            result = self.transport.send_whatsapp(to, body, **kwargs)
+        except Exception as exc:
+            self.metrics.record((time.perf_counter() - start) * 1000, error=True)
+            if self.transport.is_outage(exc):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise MessagingError(str(exc)) from exc
+
+        self.metrics.record((time.perf_counter() - start) * 1000)
+        self.breaker.record_success()
+        return result
+
+    def get_metrics(self):
+        return {'circuit': self.breaker.state, 'failures': self.breaker.failures, **self.metrics.snapshot()}
+
+
+@functools.lru_cache(maxsize=1)
+def get_gateway():
+    """One gateway per process, so the HTTP session, the breaker and the metrics are shared by all requests."""
+    return MessagingGateway(
+        import_string(settings.MESSAGING_TRANSPORT)(),
+        CircuitBreaker(settings.MESSAGING_FAILURE_THRESHOLD, settings.MESSAGING_RESET_TIMEOUT),
+    )
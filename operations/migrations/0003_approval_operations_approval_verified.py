@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_solarsolution_filter_indexes'),
+        ('operations', '0002_alter_approval_solution'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approval',
+            index=models.Index(condition=models.Q(('admin_verified', True)), fields=['solution'], name='operations_approval_verified'),
+        ),
+    ]
@@ -11,3 +11,18 @@ class Approval(TimeStampedModel):
     discrepancy_resolved = models.BooleanField(default=False, help_text="Has the discrepancy been resolved?")
     email_notification_sent = models.BooleanField(default=False,
                                                   help_text="Has the approval notification been sent to the seller?")
+
+    class Meta:
+        indexes = [
+            # Partial index for the `approved=true` listing filter, the hot path for buyers
+            models.Index(fields=['solution'], condition=models.Q(admin_verified=True),
+                         name='operations_approval_verified'),
+        ]
+
+
+class OTPCode(TimeStampedModel):
+    """One-time codes of the database OTP store (see operations.otp), one live code per number."""
+    phone_number = models.CharField(max_length=15, unique=True)
+    code = models.CharField(max_length=6)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
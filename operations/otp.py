@@ -0,0 +1,104 @@
+"""
+Where one-time codes live between `send_otp` and `confirm_otp`.
+
+Both requests can land on different gunicorn workers, so the store must be shared across
+processes: `DatabaseOTPStore` (the default, no extra infrastructure) or `CacheOTPStore` on the
+shared cache (Redis in production). Choose with the `OTP_STORE` setting.
+
+A code can be consumed once: `verify()` deletes it atomically, so two concurrent confirms with
+the right code can't both succeed. Every failed guess counts against `OTP_MAX_ATTEMPTS`, after
+which the number has to request a new code.
+"""
+import enum
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OTPCode
+
+
+class Verification(enum.Enum):
+    VERIFIED = 'verified'
+    INVALID = 'invalid'
+    EXPIRED = 'expired'
+    LOCKED = 'locked'
+
+
+def generate_code():
+    return str(100000 + secrets.randbelow(900000))
+
+
+class DatabaseOTPStore:
+    def issue(self, phone_number):
+        code = generate_code()
+        OTPCode.objects.update_or_create(phone_number=phone_number, defaults={
+            'code': code,
+            'attempts': 0,
+            'expires_at': timezone.now() + timedelta(seconds=settings.OTP_TTL),
+        })
+        return code
+
+    def verify(self, phone_number, code):
+        live = OTPCode.objects.filter(phone_number=phone_number, expires_at__gt=timezone.now())
+        open_for_attempts = live.filter(attempts__lt=settings.OTP_MAX_ATTEMPTS)
+
+        # A single DELETE, only one of two concurrent confirms can remove the row
+        consumed, _ = open_for_attempts.filter(code=code).delete()
+        if consumed:
+            return Verification.VERIFIED
+        if open_for_attempts.update(attempts=F('attempts') + 1):
+            return Verification.INVALID
+        return Verification.LOCKED if live.exists() else Verification.EXPIRED
+
+    def purge_expired(self):
+        deleted, _ = OTPCode.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+
+class CacheOTPStore:
+    """Keeps codes in the `OTP_CACHE_ALIAS` cache, which must be shared by all workers (not LocMemCache)."""
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or settings.OTP_CACHE_ALIAS]
+
+    @staticmethod
+    def keys(phone_number):
+        return f'otp:{phone_number}:code', f'otp:{phone_number}:attempts'
+
+    def issue(self, phone_number):
+        code = generate_code()
+        code_key, attempts_key = self.keys(phone_number)
+        self.cache.set_many({code_key: code, attempts_key: 0}, timeout=settings.OTP_TTL)
+        return code
+
+    def verify(self, phone_number, code):
+        code_key, attempts_key = self.keys(phone_number)
+        stored = self.cache.get(code_key)
+        if stored is None:
+            return Verification.EXPIRED
+        try:
+            attempts = self.cache.incr(attempts_key)
+        except ValueError:  # expired in between
+            return Verification.EXPIRED
+        if attempts > settings.OTP_MAX_ATTEMPTS:
+            return Verification.LOCKED
+        if stored != str(code):
+            return Verification.INVALID
+        # delete() reports whether this call removed the key, so only one confirm wins
+        if self.cache.delete(code_key):
+            self.cache.delete(attempts_key)
+            return Verification.VERIFIED
+        return Verification.EXPIRED
+
+    def purge_expired(self):
+        # Cache entries expire by themselves
+        return 0
+
+
+def get_otp_store():
+    return import_string(settings.OTP_STORE)()
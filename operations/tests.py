@@ -1,3 +1,192 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+
+from accounts.tests import BaseTestCase
+from core.models import Job
+from listings.models import SolarSolution, SolutionType, BuyerInteraction
+from .messaging import get_gateway, CircuitBreaker, CircuitOpenError, FakeTransport, MessagingError, MessagingGateway
+from .models import Approval, OTPCode
+from .otp import get_otp_store, DatabaseOTPStore, CacheOTPStore, Verification
+
+
+class ConfirmOTPTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.credentials()  # buyers confirm anonymously
+        self.solution = SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                                     seller=self.user_profile)
+        self.phone_number = '+920000000001'
+
+    def confirm(self, otp_code):
+        return self.client.post(reverse('otp-confirm-otp'), {
+            'phone_number': self.phone_number,
+            'otp_code': otp_code,
+            'solar_solution_id': self.solution.id,
+        }, format='json')
+
+    def test_confirm_records_interaction_and_counters(self):
+        code = get_otp_store().issue(self.phone_number)
+
+        response = self.confirm(code)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(BuyerInteraction.objects.filter(solar_solution=self.solution).exists())
+        self.solution.refresh_from_db()
+        self.user_profile.refresh_from_db()
+        self.assertEqual(self.solution.interaction_count, 1)
+        self.assertEqual(self.user_profile.buyers_count, 1)
+
+    def test_wrong_code_records_nothing(self):
+        get_otp_store().issue(self.phone_number)
+
+        response = self.confirm('000000')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.solution.refresh_from_db()
+        self.assertEqual(self.solution.interaction_count, 0)
+
+
+class OTPStoreTestsMixin:
+    phone_number = '+920000000002'
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def test_code_can_only_be_used_once(self):
+        store = self.make_store()
+        code = store.issue(self.phone_number)
+
+        self.assertEqual(store.verify(self.phone_number, code), Verification.VERIFIED)
+        self.assertEqual(store.verify(self.phone_number, code), Verification.EXPIRED)
+
+    def test_guesses_are_limited(self):
+        store = self.make_store()
+        code = store.issue(self.phone_number)
+
+        for _ in range(3):
+            self.assertEqual(store.verify(self.phone_number, '000000'), Verification.INVALID)
+        self.assertEqual(store.verify(self.phone_number, code), Verification.LOCKED)
+
+        code = store.issue(self.phone_number)
+        self.assertEqual(store.verify(self.phone_number, code), Verification.VERIFIED)
+
+    def test_expired_codes_are_rejected(self):
+        store = self.make_store()
+        code = store.issue(self.phone_number)
+
+        self.expire(store)
+
+        self.assertEqual(store.verify(self.phone_number, code), Verification.EXPIRED)
+
+
+@override_settings(OTP_MAX_ATTEMPTS=3)
+class DatabaseOTPStoreTestCase(OTPStoreTestsMixin, TestCase):
+    def make_store(self):
+        return DatabaseOTPStore()
+
+    def expire(self, store):
+        OTPCode.objects.update(expires_at=timezone.now())
+        self.assertEqual(store.purge_expired(), 1)
+
+
+@override_settings(OTP_MAX_ATTEMPTS=3, CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'otp-tests'},
+})
+class CacheOTPStoreTestCase(OTPStoreTestsMixin, SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+
+    def make_store(self):
+        return CacheOTPStore()
+
+    def expire(self, store):
+        caches['shared'].clear()
+
+
+class ApproveTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        seller = self.user_profile
+        self.authenticate_user(email='admin@example.com', role='admin')
+        self.solution = SolarSolution.objects.create(size=5, price=1000, solution_type=SolutionType.HYBRID,
+                                                     seller=seller)
+        self.approval = Approval.objects.create(solution=self.solution)
+
+    @override_settings(JOBS_RUN_INLINE=False)
+    def test_approve_queues_the_email(self):
+        response = self.client.post(reverse('approval-approve', args=[self.approval.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'core.tasks.send_approval_email')
+        self.assertEqual(job.kwargs, {'seller_id': self.solution.seller_id})
+
+        call_command('run_jobs', once=True, stdout=StringIO())
+
+        self.assertEqual(mail.outbox[0].to, ['testuser@example.com'])
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.transport = FakeTransport()
+        self.gateway = MessagingGateway(self.transport, CircuitBreaker(2, 30, clock=lambda: self.now))
+
+    def test_opens_after_consecutive_failures_and_recovers(self):
+        self.transport.error = ConnectionError('timed out')
+        for _ in range(2):
+            with self.assertRaises(MessagingError):
+                self.gateway.send_whatsapp('+920000000001', 'hi')
+
+        # Open: rejected without touching the provider
+        self.transport.error = None
+        with self.assertRaises(CircuitOpenError):
+            self.gateway.send_whatsapp('+920000000001', 'hi')
+        self.assertEqual(self.transport.sent, [])
+
+        # After the reset timeout one trial call goes through and closes the circuit
+        self.now = 31
+        self.gateway.send_whatsapp('+920000000001', 'hi')
+        self.assertEqual(len(self.transport.sent), 1)
+        self.assertEqual(self.gateway.breaker.state, CircuitBreaker.CLOSED)
+
+        metrics = self.gateway.get_metrics()
+        self.assertEqual((metrics['calls'], metrics['errors'], metrics['rejected']), (3, 2, 1))
+
+
+@override_settings(MESSAGING_TRANSPORT='operations.messaging.FakeTransport', MESSAGING_FAILURE_THRESHOLD=1)
+class SendOTPTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        get_gateway.cache_clear()
+        self.addCleanup(get_gateway.cache_clear)
+
+    def send(self):
+        return self.client.post(reverse('otp-send-otp'), {'phone_number': '+920000000001'}, format='json')
+
+    def test_code_is_sent_through_the_gateway(self):
+        response = self.send()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [message] = get_gateway().transport.sent
+        self.assertEqual(message['to'], '+920000000001')
+
+    def test_provider_outage_fails_fast(self):
+        get_gateway().transport.error = ConnectionError('timed out')
+
+        self.assertEqual(self.send().status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(self.send().status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        self.authenticate_user(email='admin@example.com', role='admin')
+        metrics = self.client.get(reverse('messaging-metrics')).data
+        self.assertEqual(metrics['circuit'], CircuitBreaker.OPEN)
+        self.assertEqual((metrics['errors'], metrics['rejected']), (1, 1))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ApprovalViewSet, OTPViewSet
+from .views import ApprovalViewSet, OTPViewSet, MessagingMetricsView
 
 # Create a router and register the ApprovalViewSet
 router = DefaultRouter()
@@ -11,4 +11,5 @@ router.register(r'otp', OTPViewSet, basename='otp')
 urlpatterns = [
     # Include the router URLs
     path('', include(router.urls)),
+    path('messaging-metrics/', MessagingMetricsView.as_view(), name='messaging-metrics'),
 ]
@@ -1,6 +1,3 @@
-import random
-
-from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -8,18 +5,19 @@ from rest_framework import viewsets, status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from twilio.rest import Client
+from rest_framework.views import APIView
 
 from accounts.models import UserProfile
 from accounts.permissions import IsAdmin
-from core.utils import send_approval_notification
+from core.jobs import enqueue
+from core.tasks import send_approval_email
 from cosmic_server7 import settings
 from listings.models import BuyerInteraction
+from operations.messaging import get_gateway, MessagingError
 from operations.models import Approval
+from operations.otp import get_otp_store, Verification
 from operations.serializers import ApprovalSerializer, ConfirmOTPSerializer, SendOTPSerializer
 
-client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-
 
 class ApprovalViewSet(viewsets.ModelViewSet):
     queryset = Approval.objects.all()
@@ -49,9 +47,8 @@ class ApprovalViewSet(viewsets.ModelViewSet):
         approval.admin_verified = True
         approval.email_notification_sent = True
         approval.save()
-        # Call function to send email
-        # In future we'll make this async...
-        send_approval_notification(approval.solution.seller)
+        if approval.solution.seller_id:
+            enqueue(send_approval_email, seller_id=approval.solution.seller_id)
         serializer = self.get_serializer(approval)
         return Response(serializer.data)
 
@@ -75,12 +72,9 @@ class OTPViewSet(viewsets.ViewSet):
 
         phone_number = serializer.validated_data['phone_number']
 
-        # Generate a random 6-digit OTP
-        otp = random.randint(100000, 999999)
-
-        # Store OTP in Django's cache with a 5-minute expiration time
-        cache.set(f'otp_{phone_number}', otp, timeout=60)  # Cache for 1 minutes (300 seconds)
-        message_body = f"Your OTP is: {otp}. It is valid for 1 minutes."
+        # Generate a random 6-digit OTP, kept in the shared OTP store for OTP_TTL seconds
+        otp = get_otp_store().issue(phone_number)
+        message_body = f"Your OTP is: {otp}. It is valid for {settings.OTP_TTL // 60 or 1} minutes."
 
         dummy_phone_number = "+1234567890"
         if dummy_phone_number == phone_number:
@@ -89,17 +83,12 @@ class OTPViewSet(viewsets.ViewSet):
 
         try:
             # Send the message via WhatsApp
-            message = client.messages.create(
-                body=message_body,
-                content_sid=settings.TWILIO_CONTENT_SID,
-                from_=settings.TWILIO_WHATSAPP_NUMBER,
-                # from_='whatsapp:+14155238886',
-                to=f'whatsapp:{phone_number}'
-            )
+            get_gateway().send_whatsapp(phone_number, message_body, content_sid=settings.TWILIO_CONTENT_SID)
             return Response({"message": f"OTP sent to {phone_number}"}, status=status.HTTP_200_OK)
 
-        except Exception as e:
-            return Response({"error": "Service not available. Please try again later.\n" + str(e)})
+        except MessagingError:
+            return Response({"error": "Service not available. Please try again later."},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
     @swagger_auto_schema(
         request_body=ConfirmOTPSerializer,
@@ -118,23 +107,26 @@ class OTPViewSet(viewsets.ViewSet):
         otp_code = serializer.validated_data['otp_code']
         solar_solution = serializer.validated_data.get('solar_solution_id')  # Get solar_solution if provided
 
-        # Retrieve OTP from Django's cache
-        cached_otp = cache.get(f'otp_{phone_number}')
+        # Checks and consumes the code in one step, a code can only be used once
+        result = get_otp_store().verify(phone_number, otp_code)
 
-        if not cached_otp:
+        if result == Verification.EXPIRED:
             return Response({"error": "OTP has expired or does not exist"}, status=status.HTTP_400_BAD_REQUEST)
-
-        if str(cached_otp) != str(otp_code):
+        if result == Verification.LOCKED:
+            return Response({"error": "Too many attempts. Please request a new OTP."},
+                            status=status.HTTP_429_TOO_MANY_REQUESTS)
+        if result == Verification.INVALID:
             return Response({"error": "Invalid OTP"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # OTP is valid, so we can delete it from the cache
-        cache.delete(f'otp_{phone_number}')
-
-        # If solar_solution is provided, increment the buyer reach count (or other field)
+        # If solar_solution is provided, record the interaction and bump the buyer counters
         if solar_solution:
-            # Create a new BuyerInteraction record with the WhatsApp number
-            BuyerInteraction.objects.create(
-                solar_solution=solar_solution,
-                whatsapp_number=phone_number
-            )
+            BuyerInteraction.objects.record(solar_solution, phone_number)
         return Response({"message": "OTP verified successfully"}, status=status.HTTP_200_OK)
+
+
+class MessagingMetricsView(APIView):
+    """Circuit state, error counts and latency of the WhatsApp provider as seen by this worker process."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(get_gateway().get_metrics(), status=status.HTTP_200_OK)
@@ -1,3 +1,206 @@
-from django.test import TestCase
+import json
+import tracemalloc
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, models
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from accounts.models import UserProfile
+from accounts.tests import BaseTestCase
+from .models import Panel
+from .serializers import PanelSerializer
+from .views import registry
+
+
+def sample_row(serializer_class):
+    """A valid payload for any pricelist serializer, built from its model fields."""
+    model = serializer_class.Meta.model
+    row = {}
+    for name in serializer_class.Meta.fields:
+        if name == 'id':
+            continue
+        field = model._meta.get_field(name)
+        if field.choices:
+            row[name] = field.choices[0][0]
+        elif isinstance(field, (models.IntegerField, models.DecimalField)):
+            row[name] = 100
+        else:
+            row[name] = f'{model.__name__} {name}'
+    return row
+
+
+class PriceListEngineTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        User = self.user.__class__
+        other_user = User.objects.create_user(email='other-seller@example.com', password='password')
+        self.other_seller = UserProfile.objects.create(user=other_user, role=UserProfile.Role.SELLER)
+
+    def create_items(self, prefix, viewset):
+        serializer_class = viewset.serializer_class
+        mine = viewset.queryset.model.objects.create(seller=self.user_profile, **sample_row(serializer_class))
+        theirs = viewset.queryset.model.objects.create(seller=self.other_seller, **sample_row(serializer_class))
+        return mine, theirs
+
+    def test_every_type_is_routed(self):
+        self.assertEqual(len(registry), 12)
+        for prefix, viewset in registry:
+            with self.subTest(prefix=prefix):
+                response = self.client.post(reverse(f'{prefix}-list'), sample_row(viewset.serializer_class),
+                                            format='json')
+                self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+                item = viewset.queryset.model.objects.get(id=response.data['id'])
+                self.assertEqual(item.seller, self.user_profile)
+
+    def test_my_items_action_is_scoped_to_the_seller(self):
+        for prefix, viewset in registry:
+            with self.subTest(prefix=prefix):
+                mine, _ = self.create_items(prefix, viewset)
+                url_name = viewset.my_action.replace('_', '-')
+
+                response = self.client.get(reverse(f'{prefix}-{url_name}'))
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual([item['id'] for item in response.data['results']], [mine.id])
+
+    def test_list_only_selects_rendered_columns(self):
+        prefix, viewset = registry[0]
+        self.create_items(prefix, viewset)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse(f'{prefix}-list'))
+
+        table = viewset.queryset.model._meta.db_table
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']]
+        self.assertTrue(selects)
+        self.assertTrue(all(f'"{table}"."created"' not in sql for sql in selects))
+
+    def test_bulk_delete_only_touches_own_items(self):
+        for prefix, viewset in registry:
+            with self.subTest(prefix=prefix):
+                mine, theirs = self.create_items(prefix, viewset)
+
+                response = self.client.post(reverse(f'{prefix}-bulk-delete'), {'ids': [mine.id, theirs.id]},
+                                            format='json')
+
+                self.assertEqual(response.data['deleted'], 1)
+                self.assertTrue(viewset.queryset.model.objects.filter(id=theirs.id).exists())
+
+
+class AllDataStreamingTestCase(BaseTestCase):
+    ROWS = 100_000
+    # A fully materialized response for 100k panels takes well over 100 MB
+    PEAK_MEMORY_BUDGET = 20 * 1024 * 1024
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('panel-all-data')
+
+    def create_panels(self, count):
+        row = sample_row(PanelSerializer)
+        for start in range(0, count, 10_000):
+            batch = range(start, min(count, start + 10_000))
+            Panel.objects.bulk_create([Panel(seller=self.user_profile, **row) for _ in batch])
+
+    def test_json_array_matches_serializer_output(self):
+        self.create_panels(3)
+
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        expected = PanelSerializer(Panel.objects.order_by('id'), many=True).data
+        self.assertEqual(data, json.loads(json.dumps(expected)))
+
+    def test_ndjson_output(self):
+        self.create_panels(3)
+
+        response = self.client.get(self.url, {'output': 'ndjson'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['brand_name'], 'Panel brand_name')
+
+    def test_peak_memory_is_bounded_for_100k_rows(self):
+        self.create_panels(self.ROWS)
+
+        tracemalloc.start()
+        try:
+            response = self.client.get(self.url)
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertGreater(size, self.ROWS * 50)
+        self.assertLess(peak, self.PEAK_MEMORY_BUDGET)
+
+
+class BulkImportTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('panel-bulk-import')
+        self.row = sample_row(PanelSerializer)
+
+    def test_json_rows_are_upserted_and_invalid_rows_reported(self):
+        existing = Panel.objects.create(seller=self.user_profile, **self.row)
+        rows = [
+            {**self.row, 'brand_name': 'New'},
+            {**self.row, 'id': existing.id, 'price': '250.00'},
+            {**self.row, 'capacity': 'lots'},
+            {**self.row, 'id': existing.id + 1000},
+        ]
+
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4])
+        self.assertIn('capacity', response.data['errors'][0]['errors'])
+        existing.refresh_from_db()
+        self.assertEqual(existing.price, 250)
+        self.assertTrue(Panel.objects.filter(seller=self.user_profile, brand_name='New').exists())
+
+    def test_malformed_ids_are_reported_per_row(self):
+        existing = Panel.objects.create(seller=self.user_profile, **self.row)
+        rows = [{**self.row, 'id': value} for value in ([1], {'a': 1}, '²', -1, 'abc')]
+        rows.append({**self.row, 'id': str(existing.id), 'price': '300.00'})
+
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 2, 3, 4, 5])
+        self.assertTrue(all(list(error['errors']) == ['id'] for error in response.data['errors']))
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+
+    def test_items_of_other_sellers_are_not_updated(self):
+        User = self.user.__class__
+        other_user = User.objects.create_user(email='other-seller@example.com', password='password')
+        other_seller = UserProfile.objects.create(user=other_user, role=UserProfile.Role.SELLER)
+        theirs = Panel.objects.create(seller=other_seller, **self.row)
+
+        response = self.client.post(self.url, [{**self.row, 'id': theirs.id, 'price': '1.00'}], format='json')
+
+        self.assertEqual(response.data['errors'][0]['errors'], {'id': ['Item not found.']})
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.price, 100)
+
+    def test_csv_upload_in_few_queries(self):
+        lines = ['brand_name,specification,capacity,unit,price']
+        lines += [f'Brand {i},Mono,{i},watt,{i}.50' for i in range(2500)]
+        upload = SimpleUploadedFile('panels.csv', '\n'.join(lines).encode(), content_type='text/csv')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'file': upload}, format='multipart')
+
+        self.assertEqual(response.data, {'created': 2500, 'updated': 0, 'errors': []})
+        self.assertEqual(Panel.objects.filter(seller=self.user_profile).count(), 2500)
+        # Batched inserts rather than one per row, SQLite caps the parameters per statement
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "pricelist_panel"')]
+        self.assertLess(len(inserts), 50)
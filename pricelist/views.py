@@ -1,12 +1,19 @@
+import csv
+import io
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
+from rest_framework import viewsets, serializers, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
 from accounts.permissions import IsAdminOrSeller
+from core.db_router import ReplicaReadMixin
+from core.streaming import stream_json_array, stream_ndjson
 from .serializers import (
     PanelSerializer,
     MechanicalWorkSerializer,
@@ -37,429 +44,192 @@ from .models import (
 )
 
 
-class BaseViewSet(viewsets.ModelViewSet):
-    @action(detail=False, methods=['get'])
-    def all_data(self, request):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
-
-class PanelViewSet(BaseViewSet):
-    queryset = Panel.objects.all()
-    serializer_class = PanelSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return Panel.objects.filter(seller=self.request.user.userprofile)
-        return Panel.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_panels(self, request):
-        seller = self.request.user.userprofile
-        panel_qs = Panel.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(panel_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(panel_qs, many=True)
-        return Response(serializer.data)
-
-
-class MechanicalWorkViewSet(BaseViewSet):
-    queryset = MechanicalWork.objects.all()
-    serializer_class = MechanicalWorkSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return MechanicalWork.objects.filter(seller=self.request.user.userprofile)
-        return MechanicalWork.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_mechanical_works(self, request):
-        seller = self.request.user.userprofile
-        mechanical_work_qs = MechanicalWork.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(mechanical_work_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(mechanical_work_qs, many=True)
-        return Response(serializer.data)
-
-
-class AfterSalesServiceViewSet(BaseViewSet):
-    queryset = AfterSalesService.objects.all()
-    serializer_class = AfterSalesServiceSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return AfterSalesService.objects.filter(seller=self.request.user.userprofile)
-        return AfterSalesService.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_after_sales_services(self, request):
-        seller = self.request.user.userprofile
-        after_sales_service_qs = AfterSalesService.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(after_sales_service_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(after_sales_service_qs, many=True)
-        return Response(serializer.data)
-
-
-class BmsViewSet(BaseViewSet):
-    queryset = Bms.objects.all()
-    serializer_class = BmsSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return Bms.objects.filter(seller=self.request.user.userprofile)
-        return Bms.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_bms(self, request):
-        seller = self.request.user.userprofile
-        bms_qs = Bms.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(bms_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(bms_qs, many=True)
-        return Response(serializer.data)
-
-
-class CivilWorkViewSet(BaseViewSet):
-    queryset = CivilWork.objects.all()
-    serializer_class = CivilWorkSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return CivilWork.objects.filter(seller=self.request.user.userprofile)
-        return CivilWork.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_civil_works(self, request):
-        seller = self.request.user.userprofile
-        civil_work_qs = CivilWork.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(civil_work_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(civil_work_qs, many=True)
-        return Response(serializer.data)
-
-
-class DcEarthingViewSet(BaseViewSet):
-    queryset = DcEarthing.objects.all()
-    serializer_class = DcEarthingSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return DcEarthing.objects.filter(seller=self.request.user.userprofile)
-        return DcEarthing.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
+# The `id` of a bulk import row, checked before it is used in a lookup
+import_id_field = serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1)
 
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
 
-    @action(detail=False, methods=['get'])
-    def my_dc_earthings(self, request):
-        seller = self.request.user.userprofile
-        dc_earthing_qs = DcEarthing.objects.filter(seller=seller).order_by('id')
+class BulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
 
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(dc_earthing_qs)
 
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+def read_csv_rows(file):
+    # Empty cells are left out so optional columns fall back to their defaults
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig'))
+    return [{key.strip(): value for key, value in row.items() if key and value not in ('', None)} for row in reader]
 
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(dc_earthing_qs, many=True)
-        return Response(serializer.data)
 
+class PriceListItemViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    """
+    CRUD for one pricelist item type, always scoped to the requesting seller.
 
-class ElectricWorkViewSet(BaseViewSet):
-    queryset = ElectricWork.objects.all()
-    serializer_class = ElectricWorkSerializer
+    Concrete viewsets are built by `register()` below, which also names the legacy
+    `my_<items>` action of each type (e.g. `my_panels`).
+    """
     permission_classes = [IsAuthenticated, IsAdminOrSeller]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # Read-only actions only load the columns the serializer renders
+    read_actions = {'list', 'retrieve', 'all_data'}
+    stream_chunk_size = 2000
+    bulk_import_max_rows = 10000
+    bulk_import_batch_size = 1000
+    my_action = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.my_action:
+            def my_items(self, request):
+                return self.list(request)
+
+            my_items.__name__ = cls.my_action
+            setattr(cls, cls.my_action, action(detail=False, methods=['get'])(my_items))
+            cls.read_actions = cls.read_actions | {cls.my_action}
+
+    def reads_from_replica(self, request):
+        return self.action == self.my_action
+
+    @property
+    def model(self):
+        return self.queryset.model
 
     def get_queryset(self):
+        queryset = self.model.objects.order_by('id')
         if self.request.user.is_authenticated:
-            return ElectricWork.objects.filter(seller=self.request.user.userprofile)
-        return ElectricWork.objects.all()
+            queryset = queryset.filter(seller_id=self.request.user.userprofile_id)
+        if self.action in self.read_actions:
+            queryset = queryset.only(*self.get_serializer_class().Meta.fields)
+        return queryset
 
     def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
+        serializer.save(seller_id=self.request.user.userprofile_id)
 
     def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
+        serializer.save(seller_id=self.request.user.userprofile_id)
 
     @action(detail=False, methods=['get'])
-    def my_electrical_works(self, request):
-        seller = self.request.user.userprofile
-        electrical_work_qs = ElectricWork.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(electrical_work_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(electrical_work_qs, many=True)
-        return Response(serializer.data)
-
-
-class HseEquipmentViewSet(BaseViewSet):
-    queryset = HseEquipment.objects.all()
-    serializer_class = HseEquipmentSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return HseEquipment.objects.filter(seller=self.request.user.userprofile)
-        return HseEquipment.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_hse_equipments(self, request):
-        seller = self.request.user.userprofile
-        hse_equipment_qs = HseEquipment.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(hse_equipment_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(hse_equipment_qs, many=True)
-        return Response(serializer.data)
-
-
-class InverterViewSet(BaseViewSet):
-    queryset = Inverter.objects.all()
-    serializer_class = InverterSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return Inverter.objects.filter(seller=self.request.user.userprofile)
-        return Inverter.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_inverters(self, request):
-        seller = self.request.user.userprofile
-        inverter_qs = Inverter.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(inverter_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(inverter_qs, many=True)
-        return Response(serializer.data)
-
-
-class BatteryViewSet(BaseViewSet):
-    queryset = Battery.objects.all()
-    serializer_class = BatterySerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return Battery.objects.filter(seller=self.request.user.userprofile)
-        return Battery.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_batteries(self, request):
-        seller = self.request.user.userprofile
-        battery_qs = Battery.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(battery_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(battery_qs, many=True)
-        return Response(serializer.data)
-
-
-class NetMeteringViewSet(BaseViewSet):
-    queryset = NetMetering.objects.all()
-    serializer_class = NetMeteringSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return NetMetering.objects.filter(seller=self.request.user.userprofile)
-        return NetMetering.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_net_meterings(self, request):
-        seller = self.request.user.userprofile
-        net_metering_qs = NetMetering.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(net_metering_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(net_metering_qs, many=True)
-        return Response(serializer.data)
-
-
-class OnlineMonitoringViewSet(BaseViewSet):
-    queryset = OnlineMonitoring.objects.all()
-    serializer_class = OnlineMonitoringSerializer
-    permission_classes = [IsAuthenticated, IsAdminOrSeller]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return OnlineMonitoring.objects.filter(seller=self.request.user.userprofile)
-        return OnlineMonitoring.objects.all()
-
-    def perform_create(self, serializer):
-        seller = self.request.user.userprofile
-        serializer.save(seller=seller)
-
-    def perform_update(self, serializer):
-        serializer.save(seller=self.request.user.userprofile)
-
-    @action(detail=False, methods=['get'])
-    def my_online_monitorings(self, request):
-        seller = self.request.user.userprofile
-        online_monitoring_qs = OnlineMonitoring.objects.filter(seller=seller).order_by('id')
-
-        # Apply pagination to the queryset
-        page = self.paginate_queryset(online_monitoring_qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        # If no pagination is applied, return all objects
-        serializer = self.get_serializer(online_monitoring_qs, many=True)
-        return Response(serializer.data)
+    def all_data(self, request):
+        """
+        Every item of the seller, streamed as a JSON array (or NDJSON with `?output=ndjson`).
+        Rows are read in chunks and encoded as they go, so memory stays flat for any catalog size.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = (serializer.to_representation(item) for item in queryset.iterator(chunk_size=self.stream_chunk_size))
+
+        if request.query_params.get('output') == 'ndjson':
+            return StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+        return StreamingHttpResponse(stream_json_array(rows), content_type='application/json')
+
+    @action(detail=False, methods=['post'], serializer_class=BulkDeleteSerializer)
+    def bulk_delete(self, request):
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted, _ = self.get_queryset().filter(id__in=serializer.validated_data['ids']).delete()
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """
+        Create or update many items from a JSON array or an uploaded CSV `file`.
+
+        Rows with an `id` update that item of the seller, other rows are created. Every row is
+        validated first, the valid ones are then written as one upsert in a single transaction
+        and the invalid ones are reported back by their 1-based row number.
+        """
+        if 'file' in request.FILES:
+            try:
+                rows = read_csv_rows(request.FILES['file'])
+            except (UnicodeDecodeError, csv.Error):
+                return Response({'error': 'The file is not a valid UTF-8 CSV file.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response({'error': 'Send a JSON array of items or a CSV file.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not rows:
+            return Response({'error': 'No rows to import.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.bulk_import_max_rows:
+            return Response({'error': f'At most {self.bulk_import_max_rows} rows can be imported at once.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        row_ids, id_errors = {}, {}
+        for number, row in enumerate(rows, start=1):
+            if isinstance(row, dict) and row.get('id') not in (None, ''):
+                try:
+                    row_ids[number] = import_id_field.run_validation(row['id'])
+                except ValidationError as exc:
+                    id_errors[number] = exc.detail
+        own_ids = set(self.get_queryset().filter(id__in=set(row_ids.values())).values_list('id', flat=True))
+
+        seller_id = request.user.userprofile_id
+        serializer = self.get_serializer()
+        items, errors, seen_ids = [], [], set()
+        for number, row in enumerate(rows, start=1):
+            try:
+                data = serializer.run_validation(row)
+            except ValidationError as exc:
+                errors.append({'row': number, 'errors': exc.detail})
+                continue
+
+            if number in id_errors:
+                errors.append({'row': number, 'errors': {'id': id_errors[number]}})
+                continue
+            item_id = row_ids.get(number)
+            if item_id is not None:
+                if item_id not in own_ids:
+                    errors.append({'row': number, 'errors': {'id': ['Item not found.']}})
+                    continue
+                if item_id in seen_ids:
+                    errors.append({'row': number, 'errors': {'id': ['Item is already updated by an earlier row.']}})
+                    continue
+                seen_ids.add(item_id)
+                data['id'] = item_id
+            items.append(self.model(seller_id=seller_id, **data))
+
+        update_fields = [field for field in serializer.Meta.fields if field != 'id'] + ['updated']
+        with transaction.atomic():
+            self.model.objects.bulk_create(items, batch_size=self.bulk_import_batch_size, update_conflicts=True,
+                                           unique_fields=['id'], update_fields=update_fields)
+
+        return Response({
+            'created': len(items) - len(seen_ids),
+            'updated': len(seen_ids),
+            'errors': errors,
+        }, status=status.HTTP_200_OK)
+
+
+registry = []
+
+
+def register(prefix, model, serializer_class, my_action):
+    """
+    Build the viewset for one pricelist item type and add it to the registry the urls are generated from.
+    """
+    fields = [field for field in serializer_class.Meta.fields if field != 'id']
+    viewset = type(f'{model.__name__}ViewSet', (PriceListItemViewSet,), {
+        '__module__': __name__,
+        'queryset': model.objects.all(),
+        'serializer_class': serializer_class,
+        'my_action': my_action,
+        'filterset_fields': [field for field in fields if field not in ('specification', 'price')],
+        'search_fields': [field for field in fields if field in ('brand_name', 'specification')],
+        'ordering_fields': ['id', *fields],
+    })
+    registry.append((prefix, viewset))
+    return viewset
+
+
+PanelViewSet = register('panel', Panel, PanelSerializer, 'my_panels')
+MechanicalWorkViewSet = register('mechanical-work', MechanicalWork, MechanicalWorkSerializer, 'my_mechanical_works')
+AfterSalesServiceViewSet = register('after-sales-service', AfterSalesService, AfterSalesServiceSerializer,
+                                    'my_after_sales_services')
+BmsViewSet = register('bms', Bms, BmsSerializer, 'my_bms')
+CivilWorkViewSet = register('civil-work', CivilWork, CivilWorkSerializer, 'my_civil_works')
+DcEarthingViewSet = register('dc-earthing', DcEarthing, DcEarthingSerializer, 'my_dc_earthings')
+ElectricWorkViewSet = register('electric-work', ElectricWork, ElectricWorkSerializer, 'my_electrical_works')
+HseEquipmentViewSet = register('hse-equipment', HseEquipment, HseEquipmentSerializer, 'my_hse_equipments')
+InverterViewSet = register('inverter', Inverter, InverterSerializer, 'my_inverters')
+BatteryViewSet = register('battery', Battery, BatterySerializer, 'my_batteries')
+NetMeteringViewSet = register('net-metering', NetMetering, NetMeteringSerializer, 'my_net_meterings')
+OnlineMonitoringViewSet = register('online-monitoring', OnlineMonitoring, OnlineMonitoringSerializer,
+                                   'my_online_monitorings')